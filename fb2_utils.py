@@ -1,237 +1,701 @@
-import os
-import base64
-from dataclasses import dataclass, field
-from typing import List, Optional
-
-import xml.etree.ElementTree as ET
-
-
-@dataclass
-class BookInfo:
-    title: Optional[str] = None
-    authors: List[str] = field(default_factory=list)
-    genres: List[str] = field(default_factory=list)
-    publisher: Optional[str] = None
-    date: Optional[str] = None
-    lang: Optional[str] = None
-    description: Optional[str] = None
-    cover_bytes: Optional[bytes] = None
-    full_text: Optional[str] = None  # <<< ВАЖНО: полный текст книги
-
-
-# ---------- Вспомогательные функции ----------
-
-def _local_name(tag: str) -> str:
-    """Возвращает имя тега без namespace, например '{ns}body' -> 'body'."""
-    return tag.split('}', 1)[-1]
-
-
-def _iter_children_with_name(elem, name: str):
-    """Итератор по дочерним элементам с локальным именем name."""
-    for child in list(elem):
-        if _local_name(child.tag) == name:
-            yield child
-
-
-def _find_first_child(elem, name: str):
-    for child in list(elem):
-        if _local_name(child.tag) == name:
-            return child
-    return None
-
-
-def _elem_text(elem) -> str:
-    """Возвращает полный текст элемента (включая вложенные теги)."""
-    if elem is None:
-        return ""
-    parts = []
-    for txt in elem.itertext():
-        if txt:
-            parts.append(txt)
-    return "".join(parts)
-
-
-# ---------- Извлечение только заголовка (для дерева) ----------
-
-def extract_fb2_title(path: str) -> str:
-    """
-    Быстрый способ вытащить название книги для дерева.
-    Если не получилось — возвращаем имя файла без расширения.
-    """
-    try:
-        tree = ET.parse(path)
-        root = tree.getroot()
-    except Exception:
-        return os.path.splitext(os.path.basename(path))[0]
-
-    # <FictionBook><description><title-info>...
-    description = _find_first_child(root, "description")
-    if description is not None:
-        title_info = _find_first_child(description, "title-info")
-        if title_info is not None:
-            book_title = _find_first_child(title_info, "book-title")
-            if book_title is not None:
-                text = _elem_text(book_title).strip()
-                if text:
-                    return text
-
-    return os.path.splitext(os.path.basename(path))[0]
-
-
-# ---------- Полный разбор файла ----------
-
-def parse_fb2_book_info(path: str) -> BookInfo:
-    """
-    Полноценный парсер fb2:
-    - title, authors, genres, publisher, date, lang;
-    - annotation -> description;
-    - обложка из <binary>;
-    - полный текст книги из <body> -> full_text.
-    """
-    info = BookInfo()
-
-    try:
-        tree = ET.parse(path)
-        root = tree.getroot()
-    except Exception:
-        # В случае ошибки хотя бы заголовок из имени файла
-        info.title = os.path.splitext(os.path.basename(path))[0]
-        return info
-
-    # ---------- description / title-info ----------
-    description = _find_first_child(root, "description")
-    title_info = _find_first_child(description, "title-info") if description is not None else None
-    publish_info = None
-    if description is not None:
-        # Некоторые книги используют <publish-info> для издательства/даты
-        publish_info = _find_first_child(description, "publish-info")
-
-    # --- title ---
-    if title_info is not None:
-        book_title = _find_first_child(title_info, "book-title")
-        if book_title is not None:
-            txt = _elem_text(book_title).strip()
-            if txt:
-                info.title = txt
-
-    if not info.title:
-        info.title = os.path.splitext(os.path.basename(path))[0]
-
-    # --- authors ---
-    if title_info is not None:
-        for author in _iter_children_with_name(title_info, "author"):
-            first_name = _find_first_child(author, "first-name")
-            last_name = _find_first_child(author, "last-name")
-            middle_name = _find_first_child(author, "middle-name")
-
-            parts = []
-            if first_name is not None:
-                parts.append(_elem_text(first_name).strip())
-            if middle_name is not None:
-                parts.append(_elem_text(middle_name).strip())
-            if last_name is not None:
-                parts.append(_elem_text(last_name).strip())
-
-            name = " ".join(p for p in parts if p)
-            if name:
-                info.authors.append(name)
-
-    # --- genres ---
-    if title_info is not None:
-        for genre in _iter_children_with_name(title_info, "genre"):
-            g = _elem_text(genre).strip()
-            if g:
-                info.genres.append(g)
-
-    # --- lang ---
-    if title_info is not None:
-        lang = _find_first_child(title_info, "lang")
-        if lang is not None:
-            txt = _elem_text(lang).strip()
-            if txt:
-                info.lang = txt
-
-    # --- publisher / date ---
-    if publish_info is not None:
-        publisher = _find_first_child(publish_info, "publisher")
-        if publisher is not None:
-            txt = _elem_text(publisher).strip()
-            if txt:
-                info.publisher = txt
-
-        date = _find_first_child(publish_info, "year")
-        if date is not None:
-            txt = _elem_text(date).strip()
-            if txt:
-                info.date = txt
-
-    # Иногда дата бывает и в title-info/date
-    if not info.date and title_info is not None:
-        date = _find_first_child(title_info, "date")
-        if date is not None:
-            txt = _elem_text(date).strip()
-            if txt:
-                info.date = txt
-
-    # --- annotation -> description ---
-    if title_info is not None:
-        annotation = _find_first_child(title_info, "annotation")
-        if annotation is not None:
-            # Соберём параграфы <p> в annotation
-            paras = []
-            for elem in annotation.iter():
-                if _local_name(elem.tag) == "p":
-                    t = _elem_text(elem).strip()
-                    if t:
-                        paras.append(t)
-            if paras:
-                info.description = "\n\n".join(paras)
-
-    # ---------- Обложка (binary) ----------
-    # В title-info/coverpage/image xlink:href="#id" -> <binary id="id">
-    cover_id = None
-    if title_info is not None:
-        coverpage = _find_first_child(title_info, "coverpage")
-        if coverpage is not None:
-            image = _find_first_child(coverpage, "image")
-            if image is not None:
-                href = image.attrib.get("href") or image.attrib.get("{http://www.w3.org/1999/xlink}href")
-                if href:
-                    cover_id = href.lstrip("#")
-
-    if cover_id:
-        for bin_elem in root.iter():
-            if _local_name(bin_elem.tag) == "binary":
-                if bin_elem.attrib.get("id") == cover_id:
-                    # binary содержит base64
-                    data_base64 = _elem_text(bin_elem).strip()
-                    if data_base64:
-                        try:
-                            info.cover_bytes = base64.b64decode(data_base64)
-                        except Exception:
-                            info.cover_bytes = None
-                    break
-
-    # ---------- Полный текст книги из <body> ----------
-    # Собираем все <p> из всех <body> (включая главы/sections)
-    paragraphs = []
-
-    for body in root:
-        if _local_name(body.tag) != "body":
-            continue
-
-        # Можно игнорировать body с типом "notes" при желании:
-        # if body.attrib.get("name") == "notes": continue
-
-        for elem in body.iter():
-            if _local_name(elem.tag) == "p":
-                t = _elem_text(elem).strip()
-                if t:
-                    paragraphs.append(t)
-
-    if paragraphs:
-        info.full_text = "\n\n".join(paragraphs)
-    else:
-        info.full_text = None
-
-    return info
+import io
+import os
+import atexit
+import mmap
+import binascii
+import concurrent.futures
+import functools
+import sqlite3
+import threading
+import zipfile
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+# lxml (libxml2) парсит заметно быстрее stdlib-овского ElementTree,
+# особенно многомегабайтные fb2. Если lxml не установлен — тихо
+# откатываемся на xml.etree, API ниже одинаковый.
+try:
+    from lxml import etree as ET
+    _HAVE_LXML = True
+except ImportError:
+    import xml.etree.ElementTree as ET
+    _HAVE_LXML = False
+
+if _HAVE_LXML:
+    # huge_tree — не упираться в лимиты libxml2 на больших книгах,
+    # recover — не падать на слегка битой разметке (в дикой природе частое дело)
+    # remove_blank_text здесь нельзя: эвристика libxml2 выкидывает и
+    # значимые пробелы между inline-элементами (<emphasis>a</emphasis>
+    # <strong>b</strong> слипается в "ab")
+    _LXML_PARSER = ET.XMLParser(huge_tree=True, recover=True)
+
+
+_MMAP_CHUNK = 1 << 20  # 1 МБ на кормление парсера
+
+
+def _fresh_parser():
+    """Новый парсер под feed-интерфейс (общий _LXML_PARSER не реентерабелен)."""
+    if _HAVE_LXML:
+        return ET.XMLParser(huge_tree=True, recover=True)
+    return ET.XMLParser()
+
+
+def _parse_file(path: str):
+    """
+    Разбирает файл и возвращает ElementTree (lxml или stdlib).
+
+    Большие файлы отображаем через mmap и скармливаем парсеру кусками по
+    1 МБ: меньше мелких read()-сисколлов и внутренних копий буферизованного
+    IO, а страницы файла живут в page cache ядра одной копией.
+    """
+    try:
+        with open(path, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                parser = _fresh_parser()
+                for off in range(0, len(mm), _MMAP_CHUNK):
+                    parser.feed(mm[off:off + _MMAP_CHUNK])
+                root = parser.close()
+        tree = ET.ElementTree(root)
+    except (ValueError, OSError):
+        # пустой файл / mmap недоступен (например, экзотическая ФС) —
+        # обычное буферизованное чтение
+        if _HAVE_LXML:
+            tree = ET.parse(path, _LXML_PARSER)
+        else:
+            tree = ET.parse(path)
+
+    # lxml с recover=True на безнадёжном вводе не бросает, а возвращает
+    # дерево без корня — для вызывающих это такой же провал разбора,
+    # как исключение парсера
+    if tree.getroot() is None:
+        raise ValueError(f"не удалось разобрать XML: {path}")
+    return tree
+
+
+def _iterparse(source, events=("end",)):
+    """Потоковый парсер (lxml или stdlib) с одинаковой сигнатурой."""
+    if _HAVE_LXML:
+        return ET.iterparse(source, events=events, huge_tree=True, recover=True)
+    return ET.iterparse(source, events=events)
+
+
+@functools.lru_cache(maxsize=256)
+def _load_root_cached(path: str, mtime_ns: int):
+    """Кешированный корень дерева; mtime_ns в ключе инвалидирует при изменении файла."""
+    return _parse_file(path).getroot()
+
+
+def _load_root(path: str):
+    """
+    Возвращает корень разобранного fb2, переиспользуя кеш по (path, mtime).
+    Дерево книг и страница информации дергают один и тот же файл —
+    так XML разбирается один раз, а не при каждом обращении.
+    """
+    mtime_ns = os.stat(path).st_mtime_ns
+    return _load_root_cached(path, mtime_ns)
+
+
+# slots=True: без per-instance __dict__ (при тысячах книг в списке это
+# мегабайты), атрибуты — через быстрые C-дескрипторы. Списки заморожены
+# в кортежи: без over-allocation и случайных мутаций снаружи.
+@dataclass(slots=True)
+class BookInfo:
+    title: Optional[str] = None
+    authors: Tuple[str, ...] = ()
+    genres: Tuple[str, ...] = ()
+    publisher: Optional[str] = None
+    date: Optional[str] = None
+    lang: Optional[str] = None
+    description: Optional[str] = None
+    cover_bytes: Optional[bytes] = None
+    # Заполняется лениво через load_full_text: при сканировании библиотеки
+    # тексты книг не нужны, а это главные байты и главное время разбора
+    full_text: Optional[str] = None
+
+
+# ---------- Вспомогательные функции ----------
+
+FB2_NS = "http://www.gribuser.ru/xml/fictionbook/2.0"
+
+
+def _ns_of(root) -> str:
+    """Namespace документа из корневого тега ('' если без namespace)."""
+    tag = root.tag
+    if isinstance(tag, str) and tag.startswith("{"):
+        return tag[1:tag.index("}")]
+    return ""
+
+
+@functools.lru_cache(maxsize=8)
+def _tags(ns: str) -> dict:
+    """
+    Полные Clark-имена часто проверяемых тегов для данного namespace.
+    Сравнение elem.tag == константа — это одно сравнение указателей/строк
+    вместо split+срез в _local_name на каждом элементе тела книги.
+    """
+    names = ("p", "body", "binary", "section")
+    if not ns:
+        return {name: name for name in names}
+    return {name: f"{{{ns}}}{name}" for name in names}
+
+
+if _HAVE_LXML:
+    # Прекомпилированные XPath выполняют фильтрацию в C внутри libxml2
+    _FB_NSMAP = {"fb": FB2_NS}
+    _BIN_XPATH = ET.XPath("fb:binary[@id=$cid]", namespaces=_FB_NSMAP)
+    _AUTHORS_XPATH = ET.XPath("fb:author", namespaces=_FB_NSMAP)
+    # concat + normalize-space собирают "Имя Отчество Фамилия" одним
+    # вызовом внутри libxml2 (пропущенные части схлопываются)
+    _AUTHOR_NAME_XPATH = ET.XPath(
+        "normalize-space(concat(fb:first-name, ' ',"
+        " fb:middle-name, ' ', fb:last-name))",
+        namespaces=_FB_NSMAP,
+    )
+    # string(...) отдаёт готовую строку (включая вложенные теги) одним
+    # заходом в libxml2 — без промежуточных элементов на Python-стороне
+    _META_XPATH = {
+        name: ET.XPath(f"string(fb:{name})", namespaces=_FB_NSMAP)
+        for name in ("book-title", "lang", "date", "publisher", "year")
+    }
+    _ANN_P_XPATH = ET.XPath("fb:annotation//fb:p", namespaces=_FB_NSMAP)
+
+
+def _local_name(tag) -> str:
+    """Возвращает имя тега без namespace, например '{ns}body' -> 'body'."""
+    if not isinstance(tag, str):
+        # lxml: комментарии/PI имеют не-строковый tag
+        return ""
+    return tag.split('}', 1)[-1]
+
+
+def _index_children(elem) -> dict:
+    """
+    Один проход по детям: локальное имя -> список элементов.
+    Дешевле, чем искать первого ребёнка по 10 раз на один и тот же
+    родительский элемент (каждый поиск — новый list + линейный скан).
+    """
+    index: dict = {}
+    for child in elem:
+        index.setdefault(_local_name(child.tag), []).append(child)
+    return index
+
+
+def _first(index: dict, name: str):
+    """Первый ребёнок с данным локальным именем из индекса (или None)."""
+    items = index.get(name)
+    return items[0] if items else None
+
+
+def _find_cover_binary(root, cover_id: str):
+    """
+    Ищет <binary id=...> прямым запросом по id вместо root.iter()
+    по всем элементам документа (в романе их десятки тысяч).
+    """
+    ns = _ns_of(root)
+    try:
+        if _HAVE_LXML and ns == FB2_NS:
+            found = _BIN_XPATH(root, cid=cover_id)
+            return found[0] if found else None
+        prefix = f"{{{ns}}}" if ns else ""
+        return root.find(f"{prefix}binary[@id='{cover_id}']")
+    except Exception:
+        pass
+
+    # экзотический id (кавычки и т.п.) — старый линейный обход
+    binary_tag = _tags(ns)["binary"]
+    for bin_elem in root.iter():
+        if bin_elem.tag == binary_tag or bin_elem.tag == "binary":
+            if bin_elem.attrib.get("id") == cover_id:
+                return bin_elem
+    return None
+
+
+def _elem_text(elem) -> str:
+    """Возвращает полный текст элемента (включая вложенные теги)."""
+    if elem is None:
+        return ""
+    if _HAVE_LXML:
+        # сериализация текста целиком в C; with_tail=False — хвост после
+        # закрывающего тега не часть элемента (и его нет в itertext())
+        return ET.tostring(elem, method="text", encoding="unicode", with_tail=False)
+    # str.join сам выберет итератор — без промежуточного списка
+    return "".join(elem.itertext())
+
+
+def _collect_full_text(path: str) -> Optional[str]:
+    """
+    Потоково собирает текст всех <body>, не держа DOM тела книги в памяти.
+    Каждый закрытый <p>/<section> сразу очищается (стандартный fast_iter-
+    приём), а абзацы пишутся в StringIO — без промежуточного списка строк
+    и без второго прохода, который делал бы "\n\n".join.
+    """
+    buf = io.StringIO()
+    body_depth = 0
+
+    try:
+        for event, elem in _iterparse(path, events=("start", "end")):
+            name = _local_name(elem.tag)
+
+            if event == "start":
+                if name == "body":
+                    body_depth += 1
+                elif name == "binary" and body_depth == 0:
+                    # по схеме fb2 все <binary> идут после <body> — дальше
+                    # только base64-вложения, текст закончился, парсить
+                    # оставшиеся мегабайты незачем
+                    break
+                continue
+
+            # event == "end"
+            if name == "body":
+                body_depth -= 1
+                elem.clear()
+                continue
+
+            if body_depth and name == "p":
+                t = _elem_text(elem)
+                # большинство абзацев уже чистые — стрижём только те,
+                # у которых края действительно пробельные
+                if t and (t[0].isspace() or t[-1].isspace()):
+                    t = t.strip()
+                if t:
+                    buf.write(t)
+                    buf.write("\n\n")
+
+            if name in ("p", "section", "binary", "description"):
+                elem.clear()
+                if _HAVE_LXML:
+                    # подчищаем уже обработанных соседей у родителя
+                    parent = elem.getparent()
+                    if parent is not None:
+                        while elem.getprevious() is not None:
+                            del parent[0]
+    except Exception:
+        pass
+
+    return buf.getvalue().rstrip("\n") or None
+
+
+# ---------- Извлечение только заголовка (для дерева) ----------
+
+# Дисковый кеш заголовков: при повторном сканировании папки неизменённые
+# файлы стоят один os.stat вместо разбора XML. Кеш — строго best-effort:
+# любая ошибка sqlite просто означает разбор файла заново.
+_TITLE_CACHE_PATH = os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")),
+    "grimoire",
+    "titles.sqlite",
+)
+
+_title_db = None
+_title_db_lock = threading.Lock()
+_title_db_dirty = 0  # незакоммиченные вставки
+
+
+def _title_cache_db():
+    global _title_db
+    if _title_db is None:
+        os.makedirs(os.path.dirname(_TITLE_CACHE_PATH), exist_ok=True)
+        db = sqlite3.connect(_TITLE_CACHE_PATH, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        # v2: старая версия экстрактора обрезала заголовки с инлайн-
+        # разметкой, и эти значения осели в titles — кеш с ними невалиден
+        # целиком (ключ по mtime/size их не отловит), выбрасываем таблицу
+        db.execute("DROP TABLE IF EXISTS titles")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS titles_v2 ("
+            " path TEXT PRIMARY KEY,"
+            " mtime_ns INTEGER,"
+            " size INTEGER,"
+            " title TEXT)"
+        )
+        db.commit()
+        _title_db = db
+        atexit.register(_title_cache_flush)
+    return _title_db
+
+
+def _title_cache_flush():
+    global _title_db_dirty
+    with _title_db_lock:
+        if _title_db is not None and _title_db_dirty:
+            try:
+                _title_db.commit()
+            except sqlite3.Error:
+                pass
+            _title_db_dirty = 0
+
+
+def _title_cache_get(path: str, mtime_ns: int, size: int):
+    try:
+        with _title_db_lock:
+            row = _title_cache_db().execute(
+                "SELECT mtime_ns, size, title FROM titles_v2 WHERE path = ?",
+                (path,),
+            ).fetchone()
+    except sqlite3.Error:
+        return None
+
+    if row is not None and row[0] == mtime_ns and row[1] == size:
+        return row[2]
+    return None
+
+
+def _title_cache_put(path: str, mtime_ns: int, size: int, title: str):
+    global _title_db_dirty
+    try:
+        with _title_db_lock:
+            db = _title_cache_db()
+            db.execute(
+                "INSERT OR REPLACE INTO titles_v2 (path, mtime_ns, size, title)"
+                " VALUES (?, ?, ?, ?)",
+                (path, mtime_ns, size, title),
+            )
+            # коммитим пачками, а не на каждую книгу
+            _title_db_dirty += 1
+            if _title_db_dirty >= 64:
+                db.commit()
+                _title_db_dirty = 0
+    except sqlite3.Error:
+        pass
+
+
+def extract_fb2_title(path: str, *, cancel: "threading.Event | None" = None) -> str:
+    """
+    Быстрый способ вытащить название книги для дерева.
+    Если не получилось — возвращаем имя файла без расширения.
+
+    Результат кешируется на диске по (path, mtime, size), так что повторное
+    сканирование той же папки вообще не читает неизменённые файлы.
+
+    cancel — необязательный threading.Event: выставлен — разбор
+    прерывается посреди файла, а не дочитывает его до конца.
+    """
+    fallback = os.path.splitext(os.path.basename(path))[0]
+
+    try:
+        st = os.stat(path)
+    except OSError:
+        return fallback
+
+    cached = _title_cache_get(path, st.st_mtime_ns, st.st_size)
+    if cached is not None:
+        return cached
+
+    title = _extract_fb2_title_uncached(path, fallback, cancel=cancel)
+    if cancel is not None and cancel.is_set():
+        return fallback  # недочитанный результат в кеш не пишем
+
+    _title_cache_put(path, st.st_mtime_ns, st.st_size, title)
+    return title
+
+
+def _extract_fb2_title_uncached(
+    path: str, fallback: str, *, cancel: "threading.Event | None" = None
+) -> str:
+    """
+    Собственно разбор: файл читается потоково (iterparse), <book-title>
+    лежит в самом начале, в <description>, так что мегабайты <body> и
+    base64-<binary> вообще не разбираются — выходим, как только
+    заголовок закрылся.
+
+    fb2 нередко распространяется zip-завёрнутым (в т.ч. под расширением
+    .fb2): такие распознаём по PK-сигнатуре и парсим прямо из ZipExtFile,
+    не распаковывая архив целиком.
+    """
+    try:
+        outer = open(path, "rb")
+    except OSError:
+        return fallback
+
+    try:
+        stream = outer
+        if outer.read(2) == b"PK":
+            outer.seek(0)
+            try:
+                zf = zipfile.ZipFile(outer)
+                inner = next(
+                    (n for n in zf.namelist() if n.lower().endswith(".fb2")),
+                    None,
+                )
+                if inner is not None:
+                    stream = zf.open(inner)
+            except zipfile.BadZipFile:
+                pass  # PK-сигнатура, но не архив — читаем как есть
+
+        if stream is outer:
+            outer.seek(0)
+
+        seen = 0
+        in_description = 0
+        for event, elem in _iterparse(stream, events=("start", "end")):
+            # Отмену проверяем раз в 256 элементов: заметно для
+            # гигантских файлов, неощутимо по накладным расходам
+            seen += 1
+            if (seen & 255) == 0 and cancel is not None and cancel.is_set():
+                return fallback
+
+            name = _local_name(elem.tag)
+
+            if event == "start":
+                if name == "description":
+                    in_description += 1
+                continue
+
+            if name == "book-title":
+                text = _elem_text(elem).strip()
+                if text:
+                    return text
+
+            # description закрылся, а заголовка так и не было —
+            # дальше только тело книги, нет смысла читать
+            if name == "description":
+                break
+
+            # Не даём частичному дереву расти — но только вне
+            # <description>: end дочернего элемента приходит раньше end
+            # родителя, и clear() здесь выпотрошил бы инлайн-разметку
+            # (<emphasis> и т.п.) из ещё не закрывшегося <book-title>
+            if not in_description:
+                elem.clear()
+    except Exception:
+        pass
+    finally:
+        outer.close()
+
+    return fallback
+
+
+# ---------- Полный разбор файла ----------
+
+def parse_fb2_book_info(path: str, *, tree=None) -> BookInfo:
+    """
+    Полноценный парсер fb2:
+    - title, authors, genres, publisher, date, lang;
+    - annotation -> description;
+    - обложка из <binary>.
+
+    Полный текст книги сюда НЕ входит — он нужен только ридеру и
+    загружается отдельно через load_full_text.
+
+    Если у вызывающего уже есть разобранное дерево — его можно передать
+    через tree, иначе берём корень из кеша _load_root.
+    """
+    info = BookInfo()
+
+    # Фоллбек-заголовок считаем один раз — он нужен в нескольких ветках
+    fallback_title = os.path.splitext(os.path.basename(path))[0]
+
+    try:
+        if tree is not None:
+            root = tree.getroot() if hasattr(tree, "getroot") else tree
+        else:
+            root = _load_root(path)
+        if root is None:
+            raise ValueError("пустой корень дерева")
+    except Exception:
+        # В случае ошибки хотя бы заголовок из имени файла
+        info.title = fallback_title
+        return info
+
+    # Clark-имена для горячих циклов ниже (fb2 живёт в одном namespace)
+    ns = _ns_of(root)
+    tags = _tags(ns)
+    p_tag = tags["p"]
+
+    # ---------- description / title-info ----------
+    # Каждого родителя индексируем один раз, дальше — O(1) по имени
+    description = _first(_index_children(root), "description")
+
+    title_info = None
+    publish_info = None
+    if description is not None:
+        desc_idx = _index_children(description)
+        title_info = _first(desc_idx, "title-info")
+        # Некоторые книги используют <publish-info> для издательства/даты
+        publish_info = _first(desc_idx, "publish-info")
+
+    ti_idx = _index_children(title_info) if title_info is not None else {}
+
+    # Под lxml и стандартным namespace метаданные тянем пачкой
+    # прекомпилированных XPath — по одному переходу Python->C на поле
+    use_xpath = _HAVE_LXML and ns == FB2_NS
+
+    # --- title ---
+    if use_xpath and title_info is not None:
+        txt = _META_XPATH["book-title"](title_info).strip()
+        if txt:
+            info.title = txt
+    else:
+        book_title = _first(ti_idx, "book-title")
+        if book_title is not None:
+            txt = _elem_text(book_title).strip()
+            if txt:
+                info.title = txt
+
+    if not info.title:
+        info.title = fallback_title
+
+    # --- authors ---
+    authors = []
+    if use_xpath and title_info is not None:
+        # один XPath-вызов на автора вместо четырёх поисков + join в Python
+        for author in _AUTHORS_XPATH(title_info):
+            name = _AUTHOR_NAME_XPATH(author).strip()
+            if name:
+                authors.append(name)
+    else:
+        for author in ti_idx.get("author", ()):
+            author_idx = _index_children(author)
+            parts = []
+            for part_name in ("first-name", "middle-name", "last-name"):
+                part = _first(author_idx, part_name)
+                if part is not None:
+                    parts.append(_elem_text(part).strip())
+
+            name = " ".join(p for p in parts if p)
+            if name:
+                authors.append(name)
+    info.authors = tuple(authors)
+
+    # --- genres ---
+    genres = []
+    for genre in ti_idx.get("genre", ()):
+        g = _elem_text(genre).strip()
+        if g:
+            genres.append(g)
+    info.genres = tuple(genres)
+
+    # --- lang ---
+    if use_xpath and title_info is not None:
+        txt = _META_XPATH["lang"](title_info).strip()
+        if txt:
+            info.lang = txt
+    else:
+        lang = _first(ti_idx, "lang")
+        if lang is not None:
+            txt = _elem_text(lang).strip()
+            if txt:
+                info.lang = txt
+
+    # --- publisher / date ---
+    if publish_info is not None:
+        if use_xpath:
+            txt = _META_XPATH["publisher"](publish_info).strip()
+            if txt:
+                info.publisher = txt
+            txt = _META_XPATH["year"](publish_info).strip()
+            if txt:
+                info.date = txt
+        else:
+            pi_idx = _index_children(publish_info)
+
+            publisher = _first(pi_idx, "publisher")
+            if publisher is not None:
+                txt = _elem_text(publisher).strip()
+                if txt:
+                    info.publisher = txt
+
+            date = _first(pi_idx, "year")
+            if date is not None:
+                txt = _elem_text(date).strip()
+                if txt:
+                    info.date = txt
+
+    # Иногда дата бывает и в title-info/date
+    if not info.date:
+        if use_xpath and title_info is not None:
+            txt = _META_XPATH["date"](title_info).strip()
+            if txt:
+                info.date = txt
+        else:
+            date = _first(ti_idx, "date")
+            if date is not None:
+                txt = _elem_text(date).strip()
+                if txt:
+                    info.date = txt
+
+    # --- annotation -> description ---
+    if title_info is not None:
+        paras = []
+        if use_xpath:
+            for elem in _ANN_P_XPATH(title_info):
+                t = _elem_text(elem).strip()
+                if t:
+                    paras.append(t)
+        else:
+            annotation = _first(ti_idx, "annotation")
+            if annotation is not None:
+                # Соберём параграфы <p> в annotation
+                for elem in annotation.iter():
+                    if elem.tag == p_tag or elem.tag == "p":
+                        t = _elem_text(elem).strip()
+                        if t:
+                            paras.append(t)
+        if paras:
+            info.description = "\n\n".join(paras)
+
+    # ---------- Обложка (binary) ----------
+    # В title-info/coverpage/image xlink:href="#id" -> <binary id="id">
+    cover_id = None
+    if title_info is not None:
+        coverpage = _first(ti_idx, "coverpage")
+        if coverpage is not None:
+            image = _first(_index_children(coverpage), "image")
+            if image is not None:
+                href = image.attrib.get("href") or image.attrib.get("{http://www.w3.org/1999/xlink}href")
+                if href:
+                    cover_id = href.lstrip("#")
+
+    if cover_id:
+        bin_elem = _find_cover_binary(root, cover_id)
+        if bin_elem is not None:
+            # <binary> — это один текстовый узел с base64, вложенных
+            # тегов не бывает, так что _elem_text (и его аллокации)
+            # здесь не нужен
+            raw = bin_elem.text or ""
+            if raw:
+                try:
+                    data = raw.encode("ascii", "ignore")
+                    # пробельные байты вычищаются одним C-проходом,
+                    # декодер получает уже чистый base64
+                    data = data.translate(None, b" \t\r\n")
+                    info.cover_bytes = binascii.a2b_base64(data)
+                except (binascii.Error, ValueError):
+                    info.cover_bytes = None
+
+    return info
+
+
+def load_full_text(path: str) -> Optional[str]:
+    """
+    Полный текст книги (абзацы всех <body> через \n\n) — потоковым
+    проходом, без построения DOM. Вызывается при открытии ридера;
+    результат вызывающий может сам положить в BookInfo.full_text.
+    """
+    return _collect_full_text(path)
+
+
+# ---------- Пакетный разбор библиотеки ----------
+
+def parse_many(paths, workers: Optional[int] = None):
+    """
+    Разбирает несколько книг параллельно и выдаёт BookInfo в порядке paths.
+
+    Каждый файл независим (общего состояния нет), поэтому раскладываем по
+    процессам — Python-часть разбора держит GIL, и потоки здесь почти
+    ничего не дали бы. BookInfo — обычный dataclass, через pickle ездит
+    без проблем.
+    """
+    paths = list(paths)
+
+    # Ради одного-двух файлов пул поднимать не стоит
+    if len(paths) <= 2:
+        for p in paths:
+            yield parse_fb2_book_info(p)
+        return
+
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers or os.cpu_count()
+    ) as pool:
+        yield from pool.map(parse_fb2_book_info, paths, chunksize=8)
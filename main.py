@@ -1,1010 +1,1519 @@
-import sys
-import os
-import json
-import math  # пока не используется, но пусть будет — вдруг пригодится
-
-from PyQt6.QtWidgets import (
-    QApplication,
-    QMainWindow,
-    QWidget,
-    QVBoxLayout,
-    QHBoxLayout,
-    QPushButton,
-    QFileDialog,
-    QTreeWidgetItem,
-    QMessageBox,
-    QSplitter,
-    QLabel,
-    QTextEdit,
-    QStackedWidget,
-    QLineEdit,
-    QSizePolicy,
-    QScrollArea,
-)
-from PyQt6.QtCore import (
-    Qt,
-    QThread,
-    QUrl,
-    QTimer,
-    pyqtSignal,
-    QEvent,
-)
-from PyQt6.QtGui import QPixmap, QFont, QDesktopServices, QIcon
-
-from fb2_utils import BookInfo, parse_fb2_book_info
-from theme import apply_dark_theme
-from tree_view import BookTreeWidget, MetadataWorker
-
-
-# ------------ базовые пути: работают и в скрипте, и в собранном exe ------------
-
-def get_base_dir() -> str:
-    """
-    Папка, где лежит exe (если собрано PyInstaller'ом)
-    или сам main.py (при обычном запуске).
-    """
-    if getattr(sys, "frozen", False):
-        # Запущено из собранного exe
-        return os.path.dirname(sys.executable)
-    else:
-        # Обычный запуск скрипта
-        return os.path.dirname(os.path.abspath(__file__))
-
-
-BASE_DIR = get_base_dir()
-ICON_PATH = os.path.join(BASE_DIR, "grimoire.ico")
-CACHE_PATH = os.path.join(BASE_DIR, "fb2_tree_cache.json")
-
-
-# ---------- Текстовое поле для чтения: без прокрутки + сигнал ресайза ----------
-
-class ReaderTextEdit(QTextEdit):
-    """
-    QTextEdit, который:
-    - шлёт сигнал при изменении размера viewport'а (для пересчёта страниц);
-    - умеет отключать прокрутку колёсиком.
-    """
-    viewportResized = pyqtSignal()
-
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        self.scroll_enabled: bool = True
-
-        # убираем скроллбары по умолчанию
-        self.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        self.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-
-    def resizeEvent(self, event):
-        super().resizeEvent(event)
-        self.viewportResized.emit()
-
-    def wheelEvent(self, event):
-        # если прокрутка запрещена — глушим
-        if not self.scroll_enabled:
-            event.accept()
-            return
-        super().wheelEvent(event)
-
-
-# ---------- Grimoire ----------
-
-class MainWindow(QMainWindow):
-    def __init__(self):
-        super().__init__()
-
-        # Явно разрешаем менять размер окна по обоим направлениям
-        self.setMinimumSize(600, 400)
-        self.setMaximumSize(16777215, 16777215)
-
-        self.setWindowTitle("Grimoire")
-        self.resize(1000, 600)
-
-        # Кеш подробной инфы по книгам
-        self.book_info_cache: dict[str, BookInfo] = {}
-        self.current_book_path: str | None = None
-
-        # Прогресс чтения: путь -> ratio (0..1)
-        self.book_progress: dict[str, float] = {}
-
-        # Флаг: в режиме чтения или на странице инфо
-        self.is_reading: bool = False
-
-        # Текст текущей книги и страницы
-        self.current_full_text: str | None = None
-        self.pages: list[str] = []
-        self.current_page_index: int = 0
-
-        # Кеш дерева / UI
-        self.app_dir = BASE_DIR
-        self.cache_path = CACHE_PATH
-        self.current_root_path: str | None = None
-
-        # Флаг для восстановления максимизации после show()
-        self._restore_maximized = False
-
-        # ---------- UI ----------
-
-        central = QWidget()
-        central.setSizePolicy(
-            QSizePolicy(QSizePolicy.Policy.Expanding,
-                        QSizePolicy.Policy.Expanding)
-        )
-        self.setCentralWidget(central)
-        root_layout = QVBoxLayout(central)
-
-        # Кнопки сверху
-        btn_layout = QHBoxLayout()
-        root_layout.addLayout(btn_layout)
-
-        self.btn_choose = QPushButton("Выбрать папку")
-        self.btn_choose.clicked.connect(self.choose_folder)
-        btn_layout.addWidget(self.btn_choose)
-
-        self.btn_refresh = QPushButton("Обновить")
-        self.btn_refresh.clicked.connect(self.refresh_current_folder)
-        btn_layout.addWidget(self.btn_refresh)
-
-        btn_layout.addStretch()
-
-        # Splitter: слева дерево, справа стэк (инфо/ридер)
-        self.splitter = QSplitter(Qt.Orientation.Horizontal)
-        root_layout.addWidget(self.splitter)
-
-        # Лево: дерево
-        self.book_tree = BookTreeWidget()
-        self.book_tree.setHeaderLabels(["Название"])
-        self.splitter.addWidget(self.book_tree)
-
-        # Право: стэк (без лишних QScrollArea выше)
-        self.stack = QStackedWidget()
-        self.splitter.addWidget(self.stack)
-
-        self.splitter.setStretchFactor(0, 1)
-        self.splitter.setStretchFactor(1, 3)
-
-        # ---------- Страница ИНФО (единый прокручиваемый блок) ----------
-
-        self.info_page = QWidget()
-        info_layout = QVBoxLayout(self.info_page)
-
-        # ScrollArea, в котором ВСЯ информация о книге скроллится как единый блок
-        self.info_scroll = QScrollArea()
-        self.info_scroll.setWidgetResizable(True)
-        info_layout.addWidget(self.info_scroll)
-
-        self.info_content = QWidget()
-        content_layout = QVBoxLayout(self.info_content)
-        self.info_scroll.setWidget(self.info_content)
-
-        # Заголовок
-        self.detail_title = QLabel("Выберите книгу")
-        title_font = QFont()
-        title_font.setPointSize(14)
-        title_font.setBold(True)
-        self.detail_title.setFont(title_font)
-        self.detail_title.setWordWrap(True)
-        content_layout.addWidget(self.detail_title)
-
-        # Метаданные
-        self.detail_meta = QLabel("")
-        meta_font = QFont()
-        meta_font.setPointSize(10)
-        self.detail_meta.setFont(meta_font)
-        self.detail_meta.setWordWrap(True)
-        content_layout.addWidget(self.detail_meta)
-
-        # Блок: обложка + кнопка открыть + прогресс + описание
-        self.book_block = QWidget()
-        block_layout = QVBoxLayout(self.book_block)
-
-        # Обложка
-        self.detail_cover = QLabel()
-        self.detail_cover.setAlignment(
-            Qt.AlignmentFlag.AlignHCenter | Qt.AlignmentFlag.AlignTop
-        )
-        self.detail_cover.setMaximumWidth(300)
-        self.detail_cover.setScaledContents(False)
-        self.detail_cover.setStyleSheet(
-            """
-            QLabel {
-                border: 1px solid #555;
-                border-radius: 6px;
-                background-color: #202020;
-                padding: 6px;
-            }
-            """
-        )
-        block_layout.addWidget(self.detail_cover, alignment=Qt.AlignmentFlag.AlignHCenter)
-
-        # Панель: открыть + прогресс
-        open_layout = QHBoxLayout()
-
-        self.btn_open_book = QPushButton("Открыть книгу")
-        self.btn_open_book.clicked.connect(self.open_current_book)
-        self.btn_open_book.setEnabled(False)
-        open_layout.addWidget(self.btn_open_book)
-
-        self.lbl_progress_info = QLabel("0%")
-        open_layout.addWidget(self.lbl_progress_info)
-
-        open_layout.addStretch()
-        block_layout.addLayout(open_layout)
-
-        # Описание (краткое) из fb2
-        self.info_desc = QTextEdit()
-        self.info_desc.setReadOnly(True)
-        # убираем собственные скроллбары, чтобы скроллился только общий блок
-        self.info_desc.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        self.info_desc.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        block_layout.addWidget(self.info_desc)
-
-        content_layout.addWidget(self.book_block)
-        self.book_block.setVisible(False)
-
-        self.stack.addWidget(self.info_page)
-
-        # ---------- Страница РИДЕРА ----------
-
-        self.reader_page = QWidget()
-        reader_layout = QVBoxLayout(self.reader_page)
-
-        controls_layout = QHBoxLayout()
-
-        # Кнопка назад к инфо
-        self.btn_back_info = QPushButton("К информации")
-        self.btn_back_info.clicked.connect(self.back_to_info)
-        controls_layout.addWidget(self.btn_back_info)
-
-        # Прогресс (%)
-        self.lbl_progress_read = QLabel("0%")
-        controls_layout.addWidget(self.lbl_progress_read)
-
-        controls_layout.addStretch()
-
-        # Навигация по страницам: ⟨ [page_edit] / [total] ⟩
-        self.btn_prev_page = QPushButton("⟨")
-        self.btn_prev_page.clicked.connect(self.go_prev_page)
-        self.btn_prev_page.setEnabled(False)
-        controls_layout.addWidget(self.btn_prev_page)
-
-        self.page_edit = QLineEdit("0")
-        self.page_edit.setFixedWidth(50)
-        self.page_edit.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.page_edit.setEnabled(False)
-        self.page_edit.returnPressed.connect(self.on_page_edit_return)
-        controls_layout.addWidget(self.page_edit)
-
-        self.lbl_page_total = QLabel("/0")
-        controls_layout.addWidget(self.lbl_page_total)
-
-        self.btn_next_page = QPushButton("⟩")
-        self.btn_next_page.clicked.connect(self.go_next_page)
-        self.btn_next_page.setEnabled(False)
-        controls_layout.addWidget(self.btn_next_page)
-
-        reader_layout.addLayout(controls_layout)
-
-        # Текст книги (одна страница за раз, без скролла)
-        self.reader_edit = ReaderTextEdit()
-        self.reader_edit.setReadOnly(True)
-        self.reader_edit.scroll_enabled = False  # отключаем прокрутку колёсиком
-        reader_layout.addWidget(self.reader_edit)
-
-        self.stack.addWidget(self.reader_page)
-
-        # Начально показываем страницу инфо
-        self.stack.setCurrentWidget(self.info_page)
-
-        # Сигнал выбора в дереве
-        self.book_tree.itemSelectionChanged.connect(self.on_tree_selection_changed)
-
-        # Ресайз области чтения -> перепагинация
-        self.reader_edit.viewportResized.connect(self.on_reader_resized)
-
-        # Фильтр событий для стрелок влево/вправо и блокировки scroll-клавиш
-        self.reader_edit.installEventFilter(self)
-
-        # Асинхронные метаданные для дерева
-        self.metadata_tasks: list[tuple[str, QTreeWidgetItem]] = []
-        self.metadata_thread: QThread | None = None
-        self.metadata_worker: MetadataWorker | None = None
-
-        # При старте пробуем кеш
-        if not self.load_cache():
-            self.ask_initial_folder()
-        else:
-            root_item = self.book_tree.topLevelItem(0)
-            if root_item:
-                self.book_tree.expandItem(root_item)
-            self.select_first_book()
-
-    # ---------- Event filter для клавиш в ридере ----------
-
-    def eventFilter(self, obj, event):
-        if obj is self.reader_edit and self.is_reading:
-            if event.type() == QEvent.Type.KeyPress:
-                key = event.key()
-                # Блокируем scroll-клавиши
-                if key in (
-                    Qt.Key.Key_Up,
-                    Qt.Key.Key_Down,
-                    Qt.Key.Key_PageUp,
-                    Qt.Key.Key_PageDown,
-                    Qt.Key.Key_Home,
-                    Qt.Key.Key_End,
-                ):
-                    return True
-                # Стрелки влево/вправо — листание страниц
-                if key == Qt.Key.Key_Left:
-                    self.go_prev_page()
-                    return True
-                if key == Qt.Key.Key_Right:
-                    self.go_next_page()
-                    return True
-
-        return super().eventFilter(obj, event)
-
-    # ---------- Сохранение состояния при закрытии ----------
-
-    def closeEvent(self, event):
-        self.save_cache()
-        super().closeEvent(event)
-
-    # ---------- Асинхронный воркер для заголовков в дереве ----------
-
-    def cancel_metadata_worker(self):
-        if self.metadata_worker is not None:
-            self.metadata_worker.stop()
-
-        if self.metadata_thread is not None:
-            self.metadata_thread.quit()
-            self.metadata_thread.wait()
-
-        self.metadata_worker = None
-        self.metadata_thread = None
-
-    def start_metadata_worker(self):
-        if not self.metadata_tasks:
-            self.save_cache()
-            return
-
-        self.cancel_metadata_worker()
-
-        self.metadata_thread = QThread(self)
-        self.metadata_worker = MetadataWorker(self.metadata_tasks)
-        self.metadata_worker.moveToThread(self.metadata_thread)
-
-        self.metadata_thread.started.connect(self.metadata_worker.run)
-        self.metadata_worker.titleReady.connect(self.on_title_ready)
-        self.metadata_worker.finished.connect(self.on_metadata_finished)
-        self.metadata_worker.finished.connect(self.metadata_thread.quit)
-        self.metadata_worker.finished.connect(self.metadata_worker.deleteLater)
-        self.metadata_thread.finished.connect(self.on_metadata_thread_finished)
-
-        self.metadata_thread.start()
-
-    def on_title_ready(self, item: QTreeWidgetItem, title: str):
-        item.setText(0, title)
-
-    def on_metadata_finished(self):
-        self.save_cache()
-
-    def on_metadata_thread_finished(self):
-        self.metadata_thread = None
-        self.metadata_worker = None
-
-    # ---------- Кеш дерева + состояния UI + прогресса чтения ----------
-
-    def save_cache(self):
-        if not self.current_root_path:
-            return
-
-        root_item = self.book_tree.topLevelItem(0)
-        if root_item is None:
-            return
-
-        books = []
-
-        def traverse(item: QTreeWidgetItem):
-            path = item.data(0, Qt.ItemDataRole.UserRole)
-
-            if isinstance(path, str) and os.path.isfile(path):
-                rel = os.path.relpath(path, self.current_root_path)
-                title = item.text(0)
-                abs_path = os.path.abspath(path)
-                ratio = float(self.book_progress.get(abs_path, 0.0))
-                books.append({"rel_path": rel, "title": title, "progress": ratio})
-
-            for i in range(item.childCount()):
-                traverse(item.child(i))
-
-        traverse(root_item)
-
-        ui_state = {
-            "is_maximized": self.isMaximized(),
-            "splitter_sizes": self.splitter.sizes(),
-        }
-
-        data = {
-            "root_path": self.current_root_path,
-            "books": books,
-            "ui": ui_state,
-        }
-
-        try:
-            with open(self.cache_path, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            QMessageBox.warning(self, "Ошибка сохранения кеша дерева", str(e))
-
-    def load_cache(self) -> bool:
-        if not os.path.exists(self.cache_path):
-            return False
-
-        try:
-            with open(self.cache_path, "r", encoding="utf-8") as f:
-           	 data = json.load(f)
-        except Exception:
-            return False
-
-        root_path = data.get("root_path")
-        books = data.get("books")
-
-        if not root_path or not isinstance(books, list):
-            return False
-        if not os.path.isdir(root_path):
-            return False
-
-        self.current_root_path = root_path
-        self.book_tree.clear()
-        self.book_tree.root_path = self.current_root_path
-        self.book_progress.clear()
-
-        root_item = QTreeWidgetItem([os.path.basename(root_path)])
-        root_item.setData(0, Qt.ItemDataRole.UserRole, root_path)
-
-        item_map: dict[tuple, QTreeWidgetItem] = {(): root_item}
-
-        for entry in books:
-            rel_path = entry.get("rel_path")
-            title = entry.get("title") or os.path.basename(rel_path or "")
-            progress = float(entry.get("progress", 0.0))
-            if not rel_path:
-                continue
-
-            parts = rel_path.split(os.sep)
-            if not parts:
-                continue
-
-            folders, filename = parts[:-1], parts[-1]
-            current_key = ()
-            current_item = root_item
-            full_dir_path = root_path
-
-            for folder in folders:
-                current_key = current_key + (folder,)
-                if current_key in item_map:
-                    current_item = item_map[current_key]
-                    full_dir_path = os.path.join(full_dir_path, folder)
-                    continue
-
-                folder_item = QTreeWidgetItem([folder])
-                full_dir_path = os.path.join(full_dir_path, folder)
-                folder_item.setData(0, Qt.ItemDataRole.UserRole, full_dir_path)
-                current_item.addChild(folder_item)
-                item_map[current_key] = folder_item
-                current_item = folder_item
-
-            full_file_path = os.path.join(root_path, *folders, filename)
-            book_item = QTreeWidgetItem([title])
-            book_item.setData(0, Qt.ItemDataRole.UserRole, full_file_path)
-            current_item.addChild(book_item)
-
-            # восстановим прогресс
-            self.book_progress[os.path.abspath(full_file_path)] = float(progress)
-
-        self.book_tree.addTopLevelItem(root_item)
-        self.book_tree.expandItem(root_item)
-
-        ui_state = data.get("ui")
-        self.apply_ui_state(ui_state)
-
-        return True
-
-    def apply_ui_state(self, ui_state: dict | None):
-        if not ui_state:
-            return
-
-        sizes = ui_state.get("splitter_sizes")
-        if isinstance(sizes, list) and len(sizes) == 2:
-            try:
-                self.splitter.setSizes([int(sizes[0]), int(sizes[1])])
-            except Exception:
-                pass
-
-        is_maximized = ui_state.get("is_maximized", False)
-        self._restore_maximized = bool(is_maximized)
-
-    # ---------- Выбор первой книги ----------
-
-    def select_first_book(self):
-        root = self.book_tree.topLevelItem(0)
-        if root is None:
-            return
-
-        item = self._find_first_book_item(root)
-        if item is not None:
-            self.book_tree.setCurrentItem(item)
-            self.book_tree.scrollToItem(item)
-
-    def _find_first_book_item(self, parent: QTreeWidgetItem) -> QTreeWidgetItem | None:
-        for i in range(parent.childCount()):
-            child = parent.child(i)
-            path = child.data(0, Qt.ItemDataRole.UserRole)
-            if isinstance(path, str) and os.path.isfile(path) and path.lower().endswith(".fb2"):
-                return child
-            res = self._find_first_book_item(child)
-            if res is not None:
-                return res
-        return None
-
-    # ---------- Основная логика ----------
-
-    def ask_initial_folder(self):
-        folder = QFileDialog.getExistingDirectory(
-            self,
-            "Выберите папку с FB2 книгами (первый запуск)",
-            "",
-            QFileDialog.Option.ShowDirsOnly,
-        )
-        if not folder:
-            return
-        self.build_tree_from_scan(folder)
-
-    def choose_folder(self):
-        folder = QFileDialog.getExistingDirectory(
-            self,
-            "Выберите папку с FB2 книгами",
-            self.current_root_path or "",
-            QFileDialog.Option.ShowDirsOnly,
-        )
-        if not folder:
-            return
-        self.build_tree_from_scan(folder)
-
-    def refresh_current_folder(self):
-        if not self.current_root_path or not os.path.isdir(self.current_root_path):
-            QMessageBox.information(
-                self,
-                "Обновление",
-                "Текущая папка не задана или недоступна. Выберите папку заново.",
-            )
-            self.choose_folder()
-            return
-
-        self.build_tree_from_scan(self.current_root_path)
-
-    def build_tree_from_scan(self, root_path: str):
-        if not root_path:
-            return
-
-        self.current_root_path = root_path
-        self.book_tree.root_path = self.current_root_path
-
-        self.cancel_metadata_worker()
-        self.book_tree.clear()
-        self.metadata_tasks = []
-        self.book_info_cache.clear()
-        self.current_book_path = None
-        self.is_reading = False
-        self.current_full_text = None
-        self.pages = []
-        self.current_page_index = 0
-        self.show_book_info(None, None)
-
-        root_item = QTreeWidgetItem([os.path.basename(root_path)])
-        root_item.setData(0, Qt.ItemDataRole.UserRole, root_path)
-        has_books = self._add_dir_items(root_item, root_path)
-
-        self.book_tree.addTopLevelItem(root_item)
-        self.book_tree.expandItem(root_item)
-
-        if not has_books:
-            QMessageBox.information(self, "Результат", "FB2 файлы не найдены.")
-            self.save_cache()
-            return
-
-        self.start_metadata_worker()
-        self.select_first_book()
-
-    def _add_dir_items(self, parent_item: QTreeWidgetItem, path: str) -> bool:
-        has_books = False
-
-        try:
-            entries = list(os.scandir(path))
-        except PermissionError:
-            return False
-
-        dirs = [
-            e for e in entries
-            if e.is_dir() and not e.name.startswith(".cal")
-        ]
-        files = [e for e in entries if e.is_file()]
-
-        # Папки — всегда добавляем
-        for d in sorted(dirs, key=lambda e: e.name.lower()):
-            dir_item = QTreeWidgetItem([d.name])
-            dir_item.setData(0, Qt.ItemDataRole.UserRole, d.path)
-
-            child_has_books = self._add_dir_items(dir_item, d.path)
-
-            parent_item.addChild(dir_item)
-
-            if child_has_books:
-                has_books = True
-
-        # Файлы .fb2
-        for f in sorted(files, key=lambda e: e.name.lower()):
-            if not f.name.lower().endswith(".fb2"):
-                continue
-            book_item = QTreeWidgetItem([f.name])
-            book_item.setData(0, Qt.ItemDataRole.UserRole, f.path)
-            parent_item.addChild(book_item)
-            has_books = True
-            self.metadata_tasks.append((f.path, book_item))
-
-        return has_books
-
-    # ---------- Обработка выбора в дереве ----------
-
-    def on_tree_selection_changed(self):
-        items = self.book_tree.selectedItems()
-        if not items:
-            self.show_book_info(None, None)
-            return
-
-        item = items[0]
-        path = item.data(0, Qt.ItemDataRole.UserRole)
-        if not isinstance(path, str) or not os.path.isfile(path) or not path.lower().endswith(".fb2"):
-            self.show_book_info(None, None)
-            return
-
-        self.current_book_path = path
-
-        if path in self.book_info_cache:
-            info = self.book_info_cache[path]
-        else:
-            info = parse_fb2_book_info(path)
-            self.book_info_cache[path] = info
-
-        # При выборе книги показываем страницу инфо
-        self.is_reading = False
-        self.stack.setCurrentWidget(self.info_page)
-        self.show_book_info(info, path)
-
-    def show_book_info(self, info: BookInfo | None, path: str | None):
-        if info is None:
-            self.detail_title.setText("Выберите книгу")
-            self.detail_meta.setText("")
-            self.info_desc.setPlainText("")
-            self.detail_cover.clear()
-            self.btn_open_book.setEnabled(False)
-            self.book_block.setVisible(False)
-            self.lbl_progress_info.setText("0%")
-            self.lbl_progress_read.setText("0%")
-            self.page_edit.setText("0")
-            self.lbl_page_total.setText("/0")
-            self.page_edit.setEnabled(False)
-            self.btn_prev_page.setEnabled(False)
-            self.btn_next_page.setEnabled(False)
-            return
-
-        self.book_block.setVisible(True)
-        self.btn_open_book.setEnabled(path is not None)
-
-        # Заголовок
-        if info.title:
-            self.detail_title.setText(info.title)
-        elif path:
-            self.detail_title.setText(os.path.basename(path))
-        else:
-            self.detail_title.setText("Информация о книге")
-
-        # Метаданные
-        meta_parts = []
-        if info.authors:
-            meta_parts.append("Автор(ы): " + ", ".join(info.authors))
-        if info.genres:
-            meta_parts.append("Жанр(ы): " + ", ".join(info.genres))
-        if info.publisher:
-            meta_parts.append("Издательство: " + info.publisher)
-        if info.date:
-            meta_parts.append("Дата: " + info.date)
-        if info.lang:
-            meta_parts.append("Язык: " + info.lang)
-
-        self.detail_meta.setText("\n".join(meta_parts))
-
-        # Описание
-        if info.description:
-            self.info_desc.setPlainText(info.description)
-        else:
-            self.info_desc.setPlainText("")
-
-        # Обложка
-        if info.cover_bytes:
-            pixmap = QPixmap()
-            if pixmap.loadFromData(info.cover_bytes):
-                if pixmap.width() > 300:
-                    pixmap = pixmap.scaledToWidth(
-                        300, Qt.TransformationMode.SmoothTransformation
-                    )
-                self.detail_cover.setPixmap(pixmap)
-            else:
-                self.detail_cover.clear()
-        else:
-            self.detail_cover.clear()
-
-        # Прогресс чтения для этой книги
-        if path:
-            ratio = float(self.book_progress.get(os.path.abspath(path), 0.0))
-            percent = int(round(ratio * 100))
-            self.lbl_progress_info.setText(f"{percent}%")
-            self.lbl_progress_read.setText(f"{percent}%")
-        else:
-            self.lbl_progress_info.setText("0%")
-            self.lbl_progress_read.setText("0%")
-
-        # Пока не в режиме чтения — страниц нет
-        self.page_edit.setText("0")
-        self.lbl_page_total.setText("/0")
-        self.page_edit.setEnabled(False)
-        self.btn_prev_page.setEnabled(False)
-        self.btn_next_page.setEnabled(False)
-
-    # ---------- Пагинация текста ----------
-
-    def paginate_current_text(self, ratio: float):
-        """
-        Разбивает current_full_text на страницы в зависимости от размеров reader_edit.
-        ratio (0..1) — доля прогресса, на которой надо оказаться после перепагинации.
-        """
-        if not self.current_full_text:
-            self.pages = [""]
-            self.current_page_index = 0
-            self.show_current_page()
-            return
-
-        fm = self.reader_edit.fontMetrics()
-        viewport = self.reader_edit.viewport()
-        width = max(1, viewport.width())
-        height = max(1, viewport.height())
-
-        # грубая оценка вместимости
-        avg_char_w = max(1, fm.averageCharWidth())
-        line_h = max(1, fm.lineSpacing())
-
-        chars_per_line = max(20, width // avg_char_w)
-        lines_per_page = max(3, height // line_h)
-        capacity = chars_per_line * lines_per_page
-
-        text = self.current_full_text
-        pages: list[str] = []
-        i = 0
-        n = len(text)
-
-        while i < n:
-            end = min(i + capacity, n)
-            # стараемся не резать слово: ищем пробел ближе к концу
-            split_from = min(n, i + int(capacity * 0.8))
-            split_pos = text.rfind(" ", split_from, end)
-            if split_pos == -1 or split_pos <= i:
-                split_pos = end
-            page_text = text[i:split_pos].strip()
-            pages.append(page_text)
-            i = split_pos
-
-        if not pages:
-            pages = [""]
-
-        self.pages = pages
-
-        if len(pages) == 1:
-            self.current_page_index = 0
-        else:
-            ratio = max(0.0, min(1.0, ratio))
-            self.current_page_index = int(round(ratio * (len(pages) - 1)))
-
-        self.show_current_page()
-
-    def show_current_page(self):
-        """Отображает текущую страницу и обновляет прогресс/номер."""
-        if not self.pages:
-            self.reader_edit.setPlainText("")
-            self.update_page_and_progress_labels(0.0)
-            return
-
-        idx = max(0, min(self.current_page_index, len(self.pages) - 1))
-        self.current_page_index = idx
-        self.reader_edit.setPlainText(self.pages[idx])
-
-        if len(self.pages) == 1:
-            ratio = 0.0
-        else:
-            ratio = idx / (len(self.pages) - 1)
-
-        self.update_page_and_progress_labels(ratio)
-
-    def update_page_and_progress_labels(self, ratio: float):
-        total_pages = len(self.pages) if self.is_reading and self.pages else 0
-
-        if not self.is_reading or total_pages == 0:
-            # показываем только сохранённый прогресс
-            if self.current_book_path:
-                r = float(self.book_progress.get(os.path.abspath(self.current_book_path), 0.0))
-                percent = int(round(r * 100))
-            else:
-                percent = 0
-            self.lbl_progress_info.setText(f"{percent}%")
-            self.lbl_progress_read.setText(f"{percent}%")
-            self.page_edit.setText("0")
-            self.lbl_page_total.setText("/0")
-            return
-
-        current_page = self.current_page_index + 1
-        if current_page < 1:
-            current_page = 1
-        if current_page > total_pages:
-            current_page = total_pages
-
-        self.page_edit.blockSignals(True)
-        self.page_edit.setText(str(current_page))
-        self.page_edit.blockSignals(False)
-        self.lbl_page_total.setText(f"/{total_pages}")
-
-        ratio = max(0.0, min(1.0, ratio))
-        percent = int(round(ratio * 100))
-        self.lbl_progress_info.setText(f"{percent}%")
-        self.lbl_progress_read.setText(f"{percent}%")
-
-        if self.current_book_path:
-            self.book_progress[os.path.abspath(self.current_book_path)] = ratio
-
-        # навигационные кнопки
-        self.btn_prev_page.setEnabled(total_pages > 1 and current_page > 1)
-        self.btn_next_page.setEnabled(total_pages > 1 and current_page < total_pages)
-        self.page_edit.setEnabled(total_pages > 1)
-
-    # ---------- Режим чтения ----------
-
-    def open_current_book(self):
-        """
-        Переходим в режим ридера:
-        во ВСЁ правое поле отображается текст текущей страницы.
-        """
-        if not self.current_book_path:
-            return
-
-        path = self.current_book_path
-        info = self.book_info_cache.get(path)
-        if info is None:
-            info = parse_fb2_book_info(path)
-            self.book_info_cache[path] = info
-
-        full_text = getattr(info, "full_text", None)
-        if not full_text:
-            full_text = info.description or "(Текст книги недоступен)"
-
-        self.current_full_text = full_text
-        self.is_reading = True
-        self.stack.setCurrentWidget(self.reader_page)
-
-        abs_path = os.path.abspath(path)
-        ratio = float(self.book_progress.get(abs_path, 0.0))
-
-        # Перепагинация после того, как виджет получит реальные размеры
-        QTimer.singleShot(0, lambda: self.paginate_current_text(ratio))
-
-    def back_to_info(self):
-        """Вернуться со страницы ридера на страницу информации о книге."""
-        self.is_reading = False
-        self.stack.setCurrentWidget(self.info_page)
-        # обновим прогресс на инфо-странице
-        if self.current_book_path:
-            info = self.book_info_cache.get(self.current_book_path)
-            self.show_book_info(info, self.current_book_path)
-
-    # ---------- Навигация по страницам ----------
-
-    def get_total_pages(self) -> int:
-        return len(self.pages) if self.pages else 0
-
-    def go_to_page(self, page_index: int):
-        if not self.is_reading or not self.pages:
-            return
-        total = len(self.pages)
-        page_index = max(0, min(page_index, total - 1))
-        self.current_page_index = page_index
-
-        if total == 1:
-            ratio = 0.0
-        else:
-            ratio = page_index / (total - 1)
-
-        self.show_current_page()
-        # show_current_page уже вызывает update_page_and_progress_labels
-
-    def go_next_page(self):
-        if not self.is_reading:
-            return
-        self.go_to_page(self.current_page_index + 1)
-
-    def go_prev_page(self):
-        if not self.is_reading:
-            return
-        self.go_to_page(self.current_page_index - 1)
-
-    def on_page_edit_return(self):
-        """Переход к странице по номеру, введённому в поле."""
-        if not self.is_reading or not self.pages:
-            return
-
-        text = self.page_edit.text().strip()
-        if not text.isdigit():
-            return
-        page = int(text)
-        if page < 1:
-            page = 1
-        total = len(self.pages)
-        if page > total:
-            page = total
-
-        self.go_to_page(page - 1)
-
-    # ---------- Ресайз области чтения ----------
-
-    def on_reader_resized(self):
-        """
-        При изменении размера области чтения — перепагинируем, сохраняя прогресс.
-        """
-        if not self.is_reading or not self.current_full_text or not self.current_book_path:
-            return
-
-        abs_path = os.path.abspath(self.current_book_path)
-        ratio = float(self.book_progress.get(abs_path, 0.0))
-        self.paginate_current_text(ratio)
-
-    # ---------- Для совместимости: внешнее открытие (если захочешь) ----------
-
-    def open_current_book_external(self):
-        if not self.current_book_path:
-            return
-        url = QUrl.fromLocalFile(self.current_book_path)
-        QDesktopServices.openUrl(url)
-
-
-if __name__ == "__main__":
-    app = QApplication(sys.argv)
-
-    # глобальная иконка
-    if os.path.exists(ICON_PATH):
-        icon = QIcon(ICON_PATH)
-        app.setWindowIcon(icon)
-    else:
-        icon = QIcon()
-
-    apply_dark_theme(app)
-
-    w = MainWindow()
-
-    # Иконка также для главного окна
-    if not icon.isNull():
-        w.setWindowIcon(icon)
-
-    w.show()
-
-    # Восстановление максимизации
-    if getattr(w, "_restore_maximized", False):
-        w.showMaximized()
-
-    sys.exit(app.exec())
+import sys
+import os
+import json
+import math  # пока не используется, но пусть будет — вдруг пригодится
+import pickle
+import sqlite3
+from bisect import bisect_right
+from collections import OrderedDict
+from dataclasses import replace
+
+try:
+    # Быстрая (де)сериализация кеша дерева; без orjson работает stdlib json
+    import orjson
+except ImportError:
+    orjson = None
+
+from PyQt6.QtWidgets import (
+    QApplication,
+    QMainWindow,
+    QWidget,
+    QVBoxLayout,
+    QHBoxLayout,
+    QPushButton,
+    QFileDialog,
+    QTreeWidgetItem,
+    QMessageBox,
+    QSplitter,
+    QLabel,
+    QPlainTextEdit,
+    QStackedWidget,
+    QLineEdit,
+    QSizePolicy,
+    QScrollArea,
+)
+from PyQt6.QtCore import (
+    Qt,
+    QThread,
+    QThreadPool,
+    QRunnable,
+    QUrl,
+    QTimer,
+    QObject,
+    pyqtSignal,
+    QEvent,
+)
+from PyQt6.QtGui import QPixmap, QImage, QFont, QFontMetricsF, QDesktopServices, QIcon
+
+try:
+    # Векторный поиск границ страниц; без numpy работает чистый Python
+    import numpy as np
+except ImportError:
+    np = None
+
+from fb2_utils import BookInfo, load_full_text, parse_fb2_book_info
+from theme import apply_dark_theme
+from tree_view import BookTreeWidget, MetadataWorker, KIND_ROLE
+
+
+# ------------ базовые пути: работают и в скрипте, и в собранном exe ------------
+
+def get_base_dir() -> str:
+    """
+    Папка, где лежит exe (если собрано PyInstaller'ом)
+    или сам main.py (при обычном запуске).
+    """
+    if getattr(sys, "frozen", False):
+        # Запущено из собранного exe
+        return os.path.dirname(sys.executable)
+    else:
+        # Обычный запуск скрипта
+        return os.path.dirname(os.path.abspath(__file__))
+
+
+BASE_DIR = get_base_dir()
+ICON_PATH = os.path.join(BASE_DIR, "grimoire.ico")
+CACHE_PATH = os.path.join(BASE_DIR, "fb2_tree_cache.json")
+
+# Часто используемые Qt-константы, связанные один раз: в горячих местах
+# (eventFilter, обходы дерева) цепочка атрибутов Qt.X.Y — лишние лукапы
+_USER_ROLE = Qt.ItemDataRole.UserRole
+_KEY_PRESS = QEvent.Type.KeyPress
+_KEY_LEFT = Qt.Key.Key_Left
+_KEY_RIGHT = Qt.Key.Key_Right
+_BLOCKED_KEYS = frozenset({
+    Qt.Key.Key_Up,
+    Qt.Key.Key_Down,
+    Qt.Key.Key_PageUp,
+    Qt.Key.Key_PageDown,
+    Qt.Key.Key_Home,
+    Qt.Key.Key_End,
+})
+
+
+# ---------- Текстовое поле для чтения: без прокрутки + сигнал ресайза ----------
+
+class ReaderTextEdit(QPlainTextEdit):
+    """
+    QPlainTextEdit, который:
+    - шлёт сигнал при изменении размера viewport'а (для пересчёта страниц);
+    - умеет отключать прокрутку колёсиком.
+
+    Именно QPlainTextEdit: его построчный layout на порядок быстрее
+    rich-text документа QTextEdit на больших вставках/перерисовках,
+    а мы всё равно показываем только plain text.
+    """
+    viewportResized = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.scroll_enabled: bool = True
+
+        # убираем скроллбары по умолчанию
+        self.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.viewportResized.emit()
+
+    def wheelEvent(self, event):
+        # если прокрутка запрещена — глушим
+        if not self.scroll_enabled:
+            event.accept()
+            return
+        super().wheelEvent(event)
+
+
+# ---------- Фоновый расчёт страниц ----------
+
+class PaginatorWorker(QObject):
+    """
+    В отдельном потоке: режет текст книги на страницы (список смещений).
+    На многомегабайтной книге это чистый Python-цикл по всему тексту —
+    держать его на GUI-потоке значит замораживать интерфейс.
+    """
+    # Ключ кеша пагинации едет вместе с результатом: queued-сигнал
+    # отменённого воркера может прийти уже после запуска нового, и
+    # получатель по ключу отличает актуальные смещения от устаревших
+    pagesReady = pyqtSignal(list, float, tuple)
+    finished = pyqtSignal()
+
+    def __init__(self, text: str, capacity: int, ratio: float, key: tuple):
+        super().__init__()
+        self.text = text
+        self.capacity = capacity
+        self.ratio = ratio
+        self.key = key
+        self._stopped = False
+
+    def stop(self):
+        self._stopped = True
+
+    def run(self):
+        if np is not None:
+            offsets = self._split_vectorized()
+        else:
+            offsets = self._split_scalar()
+
+        if offsets is not None and not self._stopped:
+            self._trim_offsets(offsets)
+            self.pagesReady.emit(offsets, self.ratio, self.key)
+        self.finished.emit()
+
+    def _trim_offsets(self, offsets: list):
+        """
+        Сдвигает начала страниц за пробелы один раз здесь, в фоне, —
+        тогда показ страницы обходится без strip() (лишняя аллокация
+        и проход по странице на каждом листании).
+        """
+        text = self.text
+        n = len(text)
+        isspace = str.isspace
+        for j in range(1, len(offsets) - 1):
+            o = offsets[j]
+            while o < n and isspace(text[o]):
+                o += 1
+            offsets[j] = o
+
+    def _split_vectorized(self):
+        """
+        Позиции всех пробелов считаются одним C-проходом (numpy по
+        utf-32-представлению, индексы совпадают со строковыми), дальше
+        граница каждой страницы — это searchsorted за O(log), а не
+        str.rfind-скан хвоста страницы.
+        """
+        text = self.text
+        capacity = self.capacity
+        n = len(text)
+
+        buf = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+        spaces = np.flatnonzero(buf == 0x20)
+
+        offsets: list[int] = [0]
+        i = 0
+        pages_done = 0
+
+        while i < n:
+            if (pages_done & 63) == 0 and self._stopped:
+                return None
+
+            end = min(i + capacity, n)
+            split_from = min(n, i + int(capacity * 0.8))
+
+            # последний пробел левее end (семантика rfind(split_from, end))
+            k = int(np.searchsorted(spaces, end, side="left")) - 1
+            split_pos = int(spaces[k]) if k >= 0 else -1
+            if split_pos < split_from or split_pos <= i:
+                split_pos = end
+
+            i = split_pos
+            if i < n:
+                offsets.append(i)
+            pages_done += 1
+
+        offsets.append(n)
+        return offsets
+
+    def _split_scalar(self):
+        text = self.text
+        capacity = self.capacity
+        offsets: list[int] = [0]
+        i = 0
+        n = len(text)
+        pages_done = 0
+
+        while i < n:
+            # флаг отмены проверяем раз в 64 страницы — дёшево и достаточно
+            if (pages_done & 63) == 0 and self._stopped:
+                return None
+
+            end = min(i + capacity, n)
+            # стараемся не резать слово: ищем пробел ближе к концу
+            split_from = min(n, i + int(capacity * 0.8))
+            split_pos = text.rfind(" ", split_from, end)
+            if split_pos == -1 or split_pos <= i:
+                split_pos = end
+            i = split_pos
+            if i < n:
+                offsets.append(i)
+            pages_done += 1
+
+        offsets.append(n)  # завершающее смещение, чтобы срезать последнюю страницу
+        return offsets
+
+
+class _CoverSignals(QObject):
+    """QRunnable не умеет сигналы — выносим их в отдельный QObject."""
+    ready = pyqtSignal(str, QImage)
+
+
+class CoverLoader(QRunnable):
+    """
+    Декодирует и масштабирует обложку в пуле потоков.
+    Внутри работаем с QImage (он, в отличие от QPixmap, потокобезопасен);
+    в QPixmap картинку превращает уже GUI-поток.
+    """
+
+    def __init__(self, path: str, data: bytes, signals: _CoverSignals):
+        super().__init__()
+        self.path = path
+        self.data = data
+        self.signals = signals
+
+    def run(self):
+        image = QImage()
+        if image.loadFromData(self.data) and image.width() > 300:
+            image = image.scaledToWidth(
+                300, Qt.TransformationMode.SmoothTransformation
+            )
+        self.signals.ready.emit(self.path, image)
+
+
+# ---------- Grimoire ----------
+
+class MainWindow(QMainWindow):
+    def __init__(self):
+        super().__init__()
+
+        # Явно разрешаем менять размер окна по обоим направлениям
+        self.setMinimumSize(600, 400)
+        self.setMaximumSize(16777215, 16777215)
+
+        self.setWindowTitle("Grimoire")
+        self.resize(1000, 600)
+
+        # Кеш подробной инфы по книгам
+        self.book_info_cache: dict[str, BookInfo] = {}
+
+        # Тот же кеш, но переживающий перезапуск: sqlite рядом с exe,
+        # ключ — (путь, mtime, размер), чтобы не перечитывать неизменённые fb2
+        self._info_db_path = os.path.join(BASE_DIR, "fb2_info_cache.sqlite")
+        self._info_db: sqlite3.Connection | None = None
+        self._info_db_dirty = 0  # несброшенные записи; коммитим пачками
+        self.current_book_path: str | None = None
+
+        # Прогресс чтения: путь -> ratio (0..1)
+        self.book_progress: dict[str, float] = {}
+
+        # Флаг: в режиме чтения или на странице инфо
+        self.is_reading: bool = False
+
+        # Текст текущей книги и страницы.
+        # Страницы храним не срезами, а смещениями начала страницы в
+        # current_full_text (плюс завершающий len(text)): текст и так
+        # лежит целиком в памяти, дублировать его по-страничным копиям
+        # незачем. Страница i — это текст[offsets[i]:offsets[i+1]].
+        self.current_full_text: str | None = None
+        self.page_offsets: list[int] = []
+        self.current_page_index: int = 0
+        self.total_chars: int = 0  # длина текста; прогресс = смещение / длина
+
+        # Кеш дерева / UI
+        self.app_dir = BASE_DIR
+        self.cache_path = CACHE_PATH
+        self.current_root_path: str | None = None
+
+        # Флаг для восстановления максимизации после show()
+        self._restore_maximized = False
+
+        # ---------- UI ----------
+
+        central = QWidget()
+        central.setSizePolicy(
+            QSizePolicy(QSizePolicy.Policy.Expanding,
+                        QSizePolicy.Policy.Expanding)
+        )
+        self.setCentralWidget(central)
+        root_layout = QVBoxLayout(central)
+
+        # Кнопки сверху
+        btn_layout = QHBoxLayout()
+        root_layout.addLayout(btn_layout)
+
+        self.btn_choose = QPushButton("Выбрать папку")
+        self.btn_choose.clicked.connect(self.choose_folder)
+        btn_layout.addWidget(self.btn_choose)
+
+        self.btn_refresh = QPushButton("Обновить")
+        self.btn_refresh.clicked.connect(self.refresh_current_folder)
+        btn_layout.addWidget(self.btn_refresh)
+
+        btn_layout.addStretch()
+
+        # Splitter: слева дерево, справа стэк (инфо/ридер)
+        self.splitter = QSplitter(Qt.Orientation.Horizontal)
+        root_layout.addWidget(self.splitter)
+
+        # Лево: дерево
+        self.book_tree = BookTreeWidget()
+        self.book_tree.setHeaderLabels(["Название"])
+        self.splitter.addWidget(self.book_tree)
+
+        # Право: стэк (без лишних QScrollArea выше)
+        self.stack = QStackedWidget()
+        self.splitter.addWidget(self.stack)
+
+        self.splitter.setStretchFactor(0, 1)
+        self.splitter.setStretchFactor(1, 3)
+
+        # ---------- Страница ИНФО (единый прокручиваемый блок) ----------
+
+        self.info_page = QWidget()
+        info_layout = QVBoxLayout(self.info_page)
+
+        # ScrollArea, в котором ВСЯ информация о книге скроллится как единый блок
+        self.info_scroll = QScrollArea()
+        self.info_scroll.setWidgetResizable(True)
+        info_layout.addWidget(self.info_scroll)
+
+        self.info_content = QWidget()
+        content_layout = QVBoxLayout(self.info_content)
+        self.info_scroll.setWidget(self.info_content)
+
+        # Заголовок
+        self.detail_title = QLabel("Выберите книгу")
+        title_font = QFont()
+        title_font.setPointSize(14)
+        title_font.setBold(True)
+        self.detail_title.setFont(title_font)
+        self.detail_title.setWordWrap(True)
+        content_layout.addWidget(self.detail_title)
+
+        # Метаданные
+        self.detail_meta = QLabel("")
+        meta_font = QFont()
+        meta_font.setPointSize(10)
+        self.detail_meta.setFont(meta_font)
+        self.detail_meta.setWordWrap(True)
+        content_layout.addWidget(self.detail_meta)
+
+        # Блок: обложка + кнопка открыть + прогресс + описание
+        self.book_block = QWidget()
+        block_layout = QVBoxLayout(self.book_block)
+
+        # Обложка
+        self.detail_cover = QLabel()
+        self.detail_cover.setAlignment(
+            Qt.AlignmentFlag.AlignHCenter | Qt.AlignmentFlag.AlignTop
+        )
+        self.detail_cover.setMaximumWidth(300)
+        self.detail_cover.setScaledContents(False)
+        self.detail_cover.setStyleSheet(
+            """
+            QLabel {
+                border: 1px solid #555;
+                border-radius: 6px;
+                background-color: #202020;
+                padding: 6px;
+            }
+            """
+        )
+        block_layout.addWidget(self.detail_cover, alignment=Qt.AlignmentFlag.AlignHCenter)
+
+        # Панель: открыть + прогресс
+        open_layout = QHBoxLayout()
+
+        self.btn_open_book = QPushButton("Открыть книгу")
+        self.btn_open_book.clicked.connect(self.open_current_book)
+        self.btn_open_book.setEnabled(False)
+        open_layout.addWidget(self.btn_open_book)
+
+        self.lbl_progress_info = QLabel("0%")
+        open_layout.addWidget(self.lbl_progress_info)
+
+        open_layout.addStretch()
+        block_layout.addLayout(open_layout)
+
+        # Описание (краткое) из fb2 (QPlainTextEdit — без rich-text наклада)
+        self.info_desc = QPlainTextEdit()
+        self.info_desc.setReadOnly(True)
+        # убираем собственные скроллбары, чтобы скроллился только общий блок
+        self.info_desc.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.info_desc.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        block_layout.addWidget(self.info_desc)
+
+        content_layout.addWidget(self.book_block)
+        self.book_block.setVisible(False)
+
+        self.stack.addWidget(self.info_page)
+
+        # ---------- Страница РИДЕРА ----------
+        # Строится лениво в _ensure_reader_page(): большинству сессий до
+        # открытия книги этот ворох виджетов на старте не нужен
+        self.reader_page: QWidget | None = None
+
+        # Начально показываем страницу инфо
+        self.stack.setCurrentWidget(self.info_page)
+
+        # Сигнал выбора в дереве
+        self.book_tree.itemSelectionChanged.connect(self.on_tree_selection_changed)
+
+        # Ресайз области чтения -> перепагинация с дебаунсом: при
+        # перетаскивании края окна resize сыпется на каждый пиксель,
+        # а пересчитать страницы достаточно один раз, когда юзер отпустил
+        self._repaginate_timer = QTimer(self)
+        self._repaginate_timer.setSingleShot(True)
+        self._repaginate_timer.setInterval(80)
+        self._repaginate_timer.timeout.connect(self._do_repaginate)
+        self._pending_ratio: float = 0.0
+
+        # Вместимость страницы (символов в строке, строк на страницу);
+        # пересчитывается только после реального изменения размеров
+        self._capacity_cache: tuple[int, int] | None = None
+
+        # (ширина, высота, ключ шрифта) последней пагинации: resize без
+        # фактической смены геометрии (активация окна и т.п.) — no-op
+        self._last_paginate_size: tuple[int, int, str] | None = None
+
+        # Номер страницы, текст которой сейчас стоит в reader_edit;
+        # -1 — содержимое неактуально и setPlainText обязателен
+        self._last_shown_page: int = -1
+
+        # Прогресс чтения пишем на диск отложенно: одно сохранение кеша
+        # раз в несколько секунд чтения, а не на каждое листание.
+        # Раньше прогресс жил только до closeEvent и терялся при падении.
+        self._progress_flush_timer = QTimer(self)
+        self._progress_flush_timer.setSingleShot(True)
+        self._progress_flush_timer.setInterval(5000)
+        self._progress_flush_timer.timeout.connect(self.save_cache)
+
+        # Асинхронные метаданные для дерева
+        self.metadata_tasks: list[tuple[str, QTreeWidgetItem]] = []
+        self.metadata_thread: QThread | None = None
+        self.metadata_worker: MetadataWorker | None = None
+
+        # Фоновая пагинация
+        self.paginate_thread: QThread | None = None
+        self.paginate_worker: PaginatorWorker | None = None
+
+        # Кеш готовых смещений страниц: (путь, длина текста, ключ шрифта,
+        # символов в строке, строк на странице) -> offsets. Длина отсекает
+        # перечитанный с диска изменившийся текст, ключ шрифта — смену
+        # шрифта при совпавшей оценке вместимости; возврат к книге или
+        # к прежнему размеру окна не пересчитывает ничего.
+        self._pagination_cache: OrderedDict[tuple, list[int]] = OrderedDict()
+
+        # Готовые (уже отмасштабированные) обложки: путь -> QPixmap.
+        # Декодирование уходит в QThreadPool, GUI-поток только показывает.
+        self._cover_cache: OrderedDict[str, QPixmap] = OrderedDict()
+        self._cover_signals = _CoverSignals()
+        self._cover_signals.ready.connect(self.on_cover_ready)
+        self._covers_loading: set[str] = set()
+        self._pending_page_key: tuple | None = None
+
+        # При старте пробуем кеш
+        if not self.load_cache():
+            self.ask_initial_folder()
+        else:
+            root_item = self.book_tree.topLevelItem(0)
+            if root_item:
+                self.book_tree.expandItem(root_item)
+            self.select_first_book()
+
+    def _ensure_reader_page(self):
+        """Строит страницу ридера при первом открытии книги."""
+        if self.reader_page is not None:
+            return
+
+        self.reader_page = QWidget()
+        reader_layout = QVBoxLayout(self.reader_page)
+
+        controls_layout = QHBoxLayout()
+
+        # Кнопка назад к инфо
+        self.btn_back_info = QPushButton("К информации")
+        self.btn_back_info.clicked.connect(self.back_to_info)
+        controls_layout.addWidget(self.btn_back_info)
+
+        # Прогресс (%)
+        self.lbl_progress_read = QLabel("0%")
+        controls_layout.addWidget(self.lbl_progress_read)
+
+        controls_layout.addStretch()
+
+        # Навигация по страницам: ⟨ [page_edit] / [total] ⟩
+        self.btn_prev_page = QPushButton("⟨")
+        self.btn_prev_page.clicked.connect(self.go_prev_page)
+        self.btn_prev_page.setEnabled(False)
+        controls_layout.addWidget(self.btn_prev_page)
+
+        self.page_edit = QLineEdit("0")
+        self.page_edit.setFixedWidth(50)
+        self.page_edit.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.page_edit.setEnabled(False)
+        self.page_edit.returnPressed.connect(self.on_page_edit_return)
+        controls_layout.addWidget(self.page_edit)
+
+        self.lbl_page_total = QLabel("/0")
+        controls_layout.addWidget(self.lbl_page_total)
+
+        self.btn_next_page = QPushButton("⟩")
+        self.btn_next_page.clicked.connect(self.go_next_page)
+        self.btn_next_page.setEnabled(False)
+        controls_layout.addWidget(self.btn_next_page)
+
+        reader_layout.addLayout(controls_layout)
+
+        # Текст книги (одна страница за раз, без скролла)
+        self.reader_edit = ReaderTextEdit()
+        self.reader_edit.setReadOnly(True)
+        self.reader_edit.scroll_enabled = False  # отключаем прокрутку колёсиком
+        reader_layout.addWidget(self.reader_edit)
+
+        self.stack.addWidget(self.reader_page)
+
+        self.reader_edit.viewportResized.connect(self.on_reader_resized)
+
+        # Фильтр событий для стрелок влево/вправо и блокировки scroll-клавиш
+        self.reader_edit.installEventFilter(self)
+
+    # ---------- Event filter для клавиш в ридере ----------
+
+    def eventFilter(self, obj, event):
+        if self.reader_page is not None and obj is self.reader_edit and self.is_reading:
+            if event.type() == _KEY_PRESS:
+                key = event.key()
+                # Блокируем scroll-клавиши
+                if key in _BLOCKED_KEYS:
+                    return True
+                # Стрелки влево/вправо — листание страниц
+                if key == _KEY_LEFT:
+                    self.go_prev_page()
+                    return True
+                if key == _KEY_RIGHT:
+                    self.go_next_page()
+                    return True
+
+        return super().eventFilter(obj, event)
+
+    # ---------- Сохранение состояния при закрытии ----------
+
+    def closeEvent(self, event):
+        self.save_cache()
+        self._flush_info_db()
+        super().closeEvent(event)
+
+    def _flush_info_db(self):
+        if self._info_db is not None and self._info_db_dirty:
+            try:
+                self._info_db.commit()
+            except Exception:
+                pass
+            self._info_db_dirty = 0
+
+    # ---------- Асинхронный воркер для заголовков в дереве ----------
+
+    def cancel_metadata_worker(self):
+        if self.metadata_worker is not None:
+            self.metadata_worker.stop()
+
+        if self.metadata_thread is not None:
+            self.metadata_thread.quit()
+            self.metadata_thread.wait()
+
+        self.metadata_worker = None
+        self.metadata_thread = None
+
+    def start_metadata_worker(self):
+        if not self.metadata_tasks:
+            self.save_cache()
+            return
+
+        self.cancel_metadata_worker()
+
+        self.metadata_thread = QThread(self)
+        self.metadata_worker = MetadataWorker(self.metadata_tasks)
+        self.metadata_worker.moveToThread(self.metadata_thread)
+
+        self.metadata_thread.started.connect(self.metadata_worker.run)
+        self.metadata_worker.titlesReady.connect(self.on_titles_ready)
+        self.metadata_worker.finished.connect(self.on_metadata_finished)
+        self.metadata_worker.finished.connect(self.metadata_thread.quit)
+        self.metadata_worker.finished.connect(self.metadata_worker.deleteLater)
+        self.metadata_thread.finished.connect(self.on_metadata_thread_finished)
+
+        self.metadata_thread.start()
+
+    def on_titles_ready(self, batch: list):
+        # Пачка названий одним заходом, без перерисовки на каждый setText
+        with self.book_tree.bulk_update():
+            for item, title in batch:
+                item.setText(0, title)
+
+    def on_metadata_finished(self):
+        self.save_cache()
+
+    def on_metadata_thread_finished(self):
+        self.metadata_thread = None
+        self.metadata_worker = None
+
+    # ---------- Кеш дерева + состояния UI + прогресса чтения ----------
+
+    def _iter_book_items(self, root_item: QTreeWidgetItem):
+        """Итеративно обходит дерево и отдаёт (путь, заголовок) для книг."""
+        # Обход явным стеком: без кадра вызова на каждый узел дерева,
+        # горячие функции привязаны к локальным именам
+        isfile = os.path.isfile
+
+        stack = [root_item]
+        while stack:
+            item = stack.pop()
+            path = item.data(0, _USER_ROLE)
+
+            if isinstance(path, str) and isfile(path):
+                yield path, item.text(0)
+
+            # Детей кладём в обратном порядке: стек отдаёт их с конца,
+            # и обход сохраняет порядок дерева как в рекурсивной версии
+            stack.extend(item.child(i) for i in range(item.childCount() - 1, -1, -1))
+
+    def save_cache(self):
+        if not self.current_root_path:
+            return
+
+        root_item = self.book_tree.topLevelItem(0)
+        if root_item is None:
+            return
+
+        relpath = os.path.relpath
+        progress_get = self.book_progress.get
+        root_path = self.current_root_path
+
+        books = [
+            {
+                "rel_path": relpath(path, root_path),
+                "title": title,
+                "progress": float(progress_get(path, 0.0)),
+            }
+            for path, title in self._iter_book_items(root_item)
+        ]
+
+        ui_state = {
+            "is_maximized": self.isMaximized(),
+            "splitter_sizes": self.splitter.sizes(),
+        }
+
+        data = {
+            "root_path": self.current_root_path,
+            "books": books,
+            "ui": ui_state,
+        }
+
+        try:
+            if orjson is not None:
+                with open(self.cache_path, "wb") as f:
+                    f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+            else:
+                with open(self.cache_path, "w", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            QMessageBox.warning(self, "Ошибка сохранения кеша дерева", str(e))
+
+    def load_cache(self) -> bool:
+        if not os.path.exists(self.cache_path):
+            return False
+
+        try:
+            with open(self.cache_path, "rb") as f:
+                raw = f.read()
+            data = orjson.loads(raw) if orjson is not None else json.loads(raw)
+        except Exception:
+            return False
+
+        root_path = data.get("root_path")
+        books = data.get("books")
+
+        if not root_path or not isinstance(books, list):
+            return False
+        if not os.path.isdir(root_path):
+            return False
+
+        # Корень храним сразу абсолютным: тогда все пути, собранные от него,
+        # абсолютны, и в горячих местах abspath() больше не нужен
+        root_path = os.path.abspath(root_path)
+        self.current_root_path = root_path
+        self.book_tree.clear()
+        self.book_tree.root_path = self.current_root_path
+        self.book_progress.clear()
+
+        root_item = QTreeWidgetItem([os.path.basename(root_path)])
+        root_item.setData(0, _USER_ROLE, root_path)
+        root_item.setData(0, KIND_ROLE, "d")
+
+        # Ключ — относительный путь папки одной строкой: дешевле хешировать,
+        # чем кортеж, а полный путь собирается одной конкатенацией
+        item_map: dict[str, QTreeWidgetItem] = {"": root_item}
+
+        # Детей не вешаем на родителей по одному: копим списки и в конце
+        # отдаём их одним addChildren() на родителя — так виджет не
+        # пересчитывает модель на каждой вставке. Ключ — тот же строковый
+        # путь, что и в item_map: QTreeWidgetItem нехешируем в PyQt6.
+        children_by_parent: dict[str, list[QTreeWidgetItem]] = {}
+
+        sep = os.sep
+        root_prefix = root_path if root_path.endswith(sep) else root_path + sep
+        item_map_get = item_map.get
+
+        self.book_tree.setSortingEnabled(False)
+        # Первую книгу после наполнения выбирает явный select_first_book()
+        with self.book_tree.bulk_update():
+            for entry in books:
+                rel_path = entry.get("rel_path")
+                title = entry.get("title") or os.path.basename(rel_path or "")
+                progress = float(entry.get("progress", 0.0))
+                if not rel_path:
+                    continue
+
+                folders = rel_path.split(sep)[:-1]
+                current_key = ""
+
+                for folder in folders:
+                    parent_key = current_key
+                    current_key = current_key + sep + folder if current_key else folder
+                    if item_map_get(current_key) is not None:
+                        continue
+
+                    folder_item = QTreeWidgetItem([folder])
+                    folder_item.setData(0, _USER_ROLE, root_prefix + current_key)
+                    folder_item.setData(0, KIND_ROLE, "d")
+                    children_by_parent.setdefault(parent_key, []).append(folder_item)
+                    item_map[current_key] = folder_item
+
+                full_file_path = root_prefix + rel_path
+                book_item = QTreeWidgetItem([title])
+                book_item.setData(0, _USER_ROLE, full_file_path)
+                book_item.setData(0, KIND_ROLE, "f")
+                children_by_parent.setdefault(current_key, []).append(book_item)
+
+                # восстановим прогресс
+                self.book_progress[full_file_path] = float(progress)
+
+            for parent_key, kids in children_by_parent.items():
+                item_map[parent_key].addChildren(kids)
+
+            self.book_tree.addTopLevelItem(root_item)
+            # expandAll по готовому дереву дешевле, чем раскрывать ветки
+            # по одной: виджет делает один проход без промежуточных перерисовок
+            # (обновления всё равно выключены).
+            self.book_tree.expandAll()
+
+        ui_state = data.get("ui")
+        self.apply_ui_state(ui_state)
+
+        return True
+
+    def apply_ui_state(self, ui_state: dict | None):
+        if not ui_state:
+            return
+
+        sizes = ui_state.get("splitter_sizes")
+        if isinstance(sizes, list) and len(sizes) == 2:
+            try:
+                self.splitter.setSizes([int(sizes[0]), int(sizes[1])])
+            except Exception:
+                pass
+
+        is_maximized = ui_state.get("is_maximized", False)
+        self._restore_maximized = bool(is_maximized)
+
+    # ---------- Выбор первой книги ----------
+
+    def select_first_book(self):
+        root = self.book_tree.topLevelItem(0)
+        if root is None:
+            return
+
+        item = self._find_first_book_item(root)
+        if item is not None:
+            self.book_tree.setCurrentItem(item)
+            self.book_tree.scrollToItem(item)
+
+    def _find_first_book_item(self, parent: QTreeWidgetItem) -> QTreeWidgetItem | None:
+        for i in range(parent.childCount()):
+            child = parent.child(i)
+            path = child.data(0, _USER_ROLE)
+            if isinstance(path, str) and os.path.isfile(path) and path.lower().endswith(".fb2"):
+                return child
+            res = self._find_first_book_item(child)
+            if res is not None:
+                return res
+        return None
+
+    # ---------- Основная логика ----------
+
+    def ask_initial_folder(self):
+        folder = QFileDialog.getExistingDirectory(
+            self,
+            "Выберите папку с FB2 книгами (первый запуск)",
+            "",
+            QFileDialog.Option.ShowDirsOnly,
+        )
+        if not folder:
+            return
+        self.build_tree_from_scan(folder)
+
+    def choose_folder(self):
+        folder = QFileDialog.getExistingDirectory(
+            self,
+            "Выберите папку с FB2 книгами",
+            self.current_root_path or "",
+            QFileDialog.Option.ShowDirsOnly,
+        )
+        if not folder:
+            return
+        self.build_tree_from_scan(folder)
+
+    def refresh_current_folder(self):
+        if not self.current_root_path or not os.path.isdir(self.current_root_path):
+            QMessageBox.information(
+                self,
+                "Обновление",
+                "Текущая папка не задана или недоступна. Выберите папку заново.",
+            )
+            self.choose_folder()
+            return
+
+        self.build_tree_from_scan(self.current_root_path)
+
+    def build_tree_from_scan(self, root_path: str):
+        if not root_path:
+            return
+
+        # Абсолютный корень → все пути из os.scandir тоже абсолютные,
+        # и их можно использовать как ключи book_progress напрямую
+        root_path = os.path.abspath(root_path)
+        self.current_root_path = root_path
+        self.book_tree.root_path = self.current_root_path
+
+        self.cancel_metadata_worker()
+        self.cancel_paginate_worker()
+        self._pagination_cache.clear()
+        self.book_tree.clear()
+        self.metadata_tasks = []
+        self.book_info_cache.clear()
+        self.current_book_path = None
+        self.is_reading = False
+        self.current_full_text = None
+        self.page_offsets = []
+        self.current_page_index = 0
+        self.show_book_info(None, None)
+
+        root_item = QTreeWidgetItem([os.path.basename(root_path)])
+        root_item.setData(0, _USER_ROLE, root_path)
+        root_item.setData(0, KIND_ROLE, "d")
+
+        self.book_tree.setSortingEnabled(False)
+        with self.book_tree.bulk_update():
+            has_books = self._add_dir_items(root_item, root_path)
+
+            self.book_tree.addTopLevelItem(root_item)
+            self.book_tree.expandAll()
+
+        if not has_books:
+            QMessageBox.information(self, "Результат", "FB2 файлы не найдены.")
+            self.save_cache()
+            return
+
+        self.start_metadata_worker()
+        self.select_first_book()
+
+    def _add_dir_items(self, parent_item: QTreeWidgetItem, path: str) -> bool:
+        """
+        Строит поддерево одним плоским проходом os.walk (внутри это тот же
+        scandir с d_type, т.е. без лишних stat-вызовов), а не питоньей
+        рекурсией с кадром вызова на каждую папку. Недоступные каталоги
+        os.walk молча пропускает — как раньше PermissionError.
+        """
+        has_books = False
+
+        items_by_dir: dict[str, QTreeWidgetItem] = {path: parent_item}
+        join = os.path.join
+        lower = str.lower
+
+        # followlinks — как в старой рекурсивной версии, где is_dir()
+        # ходил по симлинкам: библиотеки из прилинкованных папок видны
+        for dirpath, dirnames, filenames in os.walk(path, followlinks=True):
+            parent = items_by_dir.get(dirpath)
+            if parent is None:
+                continue
+
+            # Фильтр и порядок задаём прямо в dirnames —
+            # os.walk пойдёт дальше только по оставшимся папкам
+            dirnames[:] = sorted(
+                (d for d in dirnames if not d.startswith(".cal")), key=lower
+            )
+
+            children: list[QTreeWidgetItem] = []
+
+            # Папки — всегда добавляем
+            for d in dirnames:
+                full = join(dirpath, d)
+                dir_item = QTreeWidgetItem([d])
+                dir_item.setData(0, _USER_ROLE, full)
+                dir_item.setData(0, KIND_ROLE, "d")
+                items_by_dir[full] = dir_item
+                children.append(dir_item)
+
+            # Файлы .fb2
+            for f in sorted(filenames, key=lower):
+                if not lower(f).endswith(".fb2"):
+                    continue
+                full = join(dirpath, f)
+                book_item = QTreeWidgetItem([f])
+                book_item.setData(0, _USER_ROLE, full)
+                book_item.setData(0, KIND_ROLE, "f")
+                children.append(book_item)
+                has_books = True
+                self.metadata_tasks.append((full, book_item))
+
+            if children:
+                parent.addChildren(children)
+
+        return has_books
+
+    # ---------- Обработка выбора в дереве ----------
+
+    def on_tree_selection_changed(self):
+        items = self.book_tree.selectedItems()
+        if not items:
+            self.show_book_info(None, None)
+            return
+
+        item = items[0]
+        path = item.data(0, _USER_ROLE)
+        if not isinstance(path, str) or not os.path.isfile(path) or not path.lower().endswith(".fb2"):
+            self.show_book_info(None, None)
+            return
+
+        self.current_book_path = path
+        info = self._get_book_info(path)
+
+        # При выборе книги показываем страницу инфо
+        self.is_reading = False
+        self.stack.setCurrentWidget(self.info_page)
+        self.show_book_info(info, path)
+
+    def _info_cache_db(self) -> sqlite3.Connection:
+        """Ленивая инициализация дискового кеша метаданных."""
+        if self._info_db is None:
+            db = sqlite3.connect(self._info_db_path)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS info ("
+                " path TEXT PRIMARY KEY,"
+                " mtime_ns INTEGER,"
+                " size INTEGER,"
+                " blob BLOB)"
+            )
+            self._info_db = db
+        return self._info_db
+
+    def _get_book_info(self, path: str) -> BookInfo:
+        """BookInfo из памяти, с диска или, в крайнем случае, разбором fb2."""
+        info = self.book_info_cache.get(path)
+        if info is not None:
+            return info
+
+        try:
+            st = os.stat(path)
+            stat_key = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            stat_key = None
+
+        if stat_key is not None:
+            try:
+                row = self._info_cache_db().execute(
+                    "SELECT mtime_ns, size, blob FROM info WHERE path = ?",
+                    (path,),
+                ).fetchone()
+                if row is not None and (row[0], row[1]) == stat_key:
+                    info = pickle.loads(row[2])
+            except Exception:
+                info = None  # битый кеш — просто перечитаем книгу
+
+        if info is None:
+            info = parse_fb2_book_info(path)
+            if stat_key is not None:
+                try:
+                    # full_text в кеш не пишем: он ленивый и огромный
+                    blob = pickle.dumps(
+                        replace(info, full_text=None),
+                        protocol=pickle.HIGHEST_PROTOCOL,
+                    )
+                    db = self._info_cache_db()
+                    db.execute(
+                        "INSERT OR REPLACE INTO info VALUES (?, ?, ?, ?)",
+                        (path, stat_key[0], stat_key[1], blob),
+                    )
+                    # Write-behind: коммит раз в 16 записей, остальное
+                    # досбрасывается при выходе в closeEvent
+                    self._info_db_dirty += 1
+                    if self._info_db_dirty >= 16:
+                        db.commit()
+                        self._info_db_dirty = 0
+                except Exception:
+                    pass  # кеш — не повод уронить показ книги
+
+        self.book_info_cache[path] = info
+        return info
+
+    def show_book_info(self, info: BookInfo | None, path: str | None):
+        if info is None:
+            self.detail_title.setText("Выберите книгу")
+            self.detail_meta.setText("")
+            self.info_desc.setPlainText("")
+            self.detail_cover.clear()
+            self.btn_open_book.setEnabled(False)
+            self.book_block.setVisible(False)
+            self.lbl_progress_info.setText("0%")
+            self._reset_reader_controls("0%")
+            return
+
+        self.book_block.setVisible(True)
+        self.btn_open_book.setEnabled(path is not None)
+
+        # Заголовок
+        if info.title:
+            self.detail_title.setText(info.title)
+        elif path:
+            self.detail_title.setText(os.path.basename(path))
+        else:
+            self.detail_title.setText("Информация о книге")
+
+        # Метаданные
+        meta_parts = []
+        if info.authors:
+            meta_parts.append("Автор(ы): " + ", ".join(info.authors))
+        if info.genres:
+            meta_parts.append("Жанр(ы): " + ", ".join(info.genres))
+        if info.publisher:
+            meta_parts.append("Издательство: " + info.publisher)
+        if info.date:
+            meta_parts.append("Дата: " + info.date)
+        if info.lang:
+            meta_parts.append("Язык: " + info.lang)
+
+        self.detail_meta.setText("\n".join(meta_parts))
+
+        # Описание
+        if info.description:
+            self.info_desc.setPlainText(info.description)
+        else:
+            self.info_desc.setPlainText("")
+
+        # Обложка
+        cached_cover = self._cover_cache.get(path) if path else None
+        if cached_cover is not None:
+            self._cover_cache.move_to_end(path)
+            if cached_cover.isNull():
+                self.detail_cover.clear()
+            else:
+                self.detail_cover.setPixmap(cached_cover)
+        elif info.cover_bytes and path:
+            # Декодируем в фоне; пока грузится — пустое место под обложку
+            self.detail_cover.clear()
+            if path not in self._covers_loading:
+                self._covers_loading.add(path)
+                QThreadPool.globalInstance().start(
+                    CoverLoader(path, info.cover_bytes, self._cover_signals)
+                )
+        else:
+            self.detail_cover.clear()
+
+        # Прогресс чтения для этой книги
+        if path:
+            ratio = float(self.book_progress.get(path, 0.0))
+            percent = int(round(ratio * 100))
+        else:
+            percent = 0
+        self.lbl_progress_info.setText(f"{percent}%")
+
+        # Пока не в режиме чтения — страниц нет
+        self._reset_reader_controls(f"{percent}%")
+
+    def _reset_reader_controls(self, progress_text: str):
+        """Сбрасывает контролы ридера (если страница уже построена)."""
+        if self.reader_page is None:
+            return
+        self.lbl_progress_read.setText(progress_text)
+        self.page_edit.setText("0")
+        self.lbl_page_total.setText("/0")
+        self.page_edit.setEnabled(False)
+        self.btn_prev_page.setEnabled(False)
+        self.btn_next_page.setEnabled(False)
+
+    def on_cover_ready(self, path: str, image: QImage):
+        self._covers_loading.discard(path)
+
+        pixmap = QPixmap() if image.isNull() else QPixmap.fromImage(image)
+        self._cover_cache[path] = pixmap
+        while len(self._cover_cache) > 64:
+            self._cover_cache.popitem(last=False)
+
+        # Показываем, только если пользователь всё ещё на этой книге
+        if path == self.current_book_path and not self.is_reading:
+            if pixmap.isNull():
+                self.detail_cover.clear()
+            else:
+                self.detail_cover.setPixmap(pixmap)
+
+    # ---------- Пагинация текста ----------
+
+    def paginate_current_text(self, ratio: float):
+        """
+        Разбивает current_full_text на страницы в зависимости от размеров reader_edit.
+        ratio (0..1) — доля прогресса, на которой надо оказаться после перепагинации.
+        """
+        if not self.current_full_text:
+            self.page_offsets = [0, 0]
+            self.current_page_index = 0
+            self.total_chars = 0
+            self.show_current_page()
+            return
+
+        viewport = self.reader_edit.viewport()
+        self._last_paginate_size = (
+            viewport.width(),
+            viewport.height(),
+            self.reader_edit.font().key(),
+        )
+
+        cap = self._capacity_cache
+        if cap is None:
+            # QFontMetricsF: дробная ширина глифов, без накопления
+            # целочисленной ошибки округления на сотне символов
+            fm = QFontMetricsF(self.reader_edit.font())
+            width = max(1, viewport.width())
+            height = max(1, viewport.height())
+
+            # Ширину символа калибруем по длинной строке: averageCharWidth
+            # у пропорциональных шрифтов заметно врёт в обе стороны
+            avg_char_w = max(1.0, fm.horizontalAdvance("x" * 100) / 100.0)
+            line_h = max(1.0, fm.lineSpacing())
+
+            chars_per_line = max(20, int(width / avg_char_w))
+            lines_per_page = max(3, int(height / line_h))
+            cap = self._capacity_cache = (chars_per_line, lines_per_page)
+
+        chars_per_line, lines_per_page = cap
+        capacity = chars_per_line * lines_per_page
+
+        self.cancel_paginate_worker()
+
+        # Для того же текста, шрифта и вместимости смещения уже посчитаны
+        key = (
+            self.current_book_path or "",
+            len(self.current_full_text),
+            self.reader_edit.font().key(),
+            chars_per_line,
+            lines_per_page,
+        )
+        cached = self._pagination_cache.get(key)
+        if cached is not None:
+            self._pagination_cache.move_to_end(key)
+            self._pending_page_key = key
+            self.on_pages_ready(cached, ratio, key)
+            return
+
+        text = self.current_full_text
+        n = len(text)
+        ratio = max(0.0, min(1.0, ratio))
+
+        # Пока поток считает смещения, показываем приблизительную страницу,
+        # чтобы читатель не смотрел на пустой экран
+        approx_start = int(ratio * max(0, n - capacity))
+        self.reader_edit.setPlainText(text[approx_start:approx_start + capacity].strip())
+        self._last_shown_page = -1  # в ридере не точная страница, а прикидка
+
+        # ...и оценочное "N / M" по вместимости, чтобы подписи не висели
+        # устаревшими до прихода точной разбивки
+        est_total = max(1, -(-n // capacity))  # ceil без float
+        est_page = min(est_total, int(ratio * est_total) + 1)
+        self.page_edit.blockSignals(True)
+        self.page_edit.setText(str(est_page))
+        self.page_edit.blockSignals(False)
+        self.lbl_page_total.setText(f"/≈{est_total}")
+
+        self._pending_page_key = key
+
+        self.paginate_thread = QThread(self)
+        self.paginate_worker = PaginatorWorker(text, capacity, ratio, key)
+        self.paginate_worker.moveToThread(self.paginate_thread)
+
+        self.paginate_thread.started.connect(self.paginate_worker.run)
+        self.paginate_worker.pagesReady.connect(self.on_pages_ready)
+        self.paginate_worker.finished.connect(self.paginate_thread.quit)
+        self.paginate_worker.finished.connect(self.paginate_worker.deleteLater)
+        self.paginate_thread.finished.connect(self.on_paginate_thread_finished)
+
+        self.paginate_thread.start()
+
+    def cancel_paginate_worker(self):
+        if self.paginate_worker is not None:
+            self.paginate_worker.stop()
+
+        if self.paginate_thread is not None:
+            self.paginate_thread.quit()
+            self.paginate_thread.wait()
+
+        self.paginate_worker = None
+        self.paginate_thread = None
+        # Отмена = результат не нужен: если pagesReady уже стоял в очереди,
+        # его ключ не совпадёт с ожидаемым и он будет отброшен
+        self._pending_page_key = None
+
+    def on_pages_ready(self, offsets: list, ratio: float, key: tuple):
+        # Результат отменённого воркера (другая книга или старая вместимость),
+        # успевший встать в очередь до cancel_paginate_worker, — игнорируем:
+        # иначе он отравил бы LRU-кеш под чужим ключом
+        if key != self._pending_page_key:
+            return
+
+        self._pending_page_key = None
+        self._pagination_cache[key] = offsets
+        while len(self._pagination_cache) > 8:
+            self._pagination_cache.popitem(last=False)
+
+        self.page_offsets = offsets
+        self.total_chars = offsets[-1] if offsets else 0
+        self._last_shown_page = -1  # границы страниц сменились
+        total = len(offsets) - 1
+
+        if total <= 1:
+            self.current_page_index = 0
+        else:
+            # ratio — доля символов: ищем страницу, содержащую это смещение
+            ratio = max(0.0, min(1.0, ratio))
+            target = int(ratio * self.total_chars)
+            self.current_page_index = max(0, bisect_right(offsets, target, 0, total) - 1)
+
+        self.show_current_page()
+
+    def on_paginate_thread_finished(self):
+        self.paginate_thread = None
+        self.paginate_worker = None
+
+    def show_current_page(self):
+        """Отображает текущую страницу и обновляет прогресс/номер."""
+        total = self.get_total_pages()
+        if total <= 0 or not self.current_full_text:
+            self.reader_edit.setPlainText("")
+            self._last_shown_page = -1
+            self.update_page_and_progress_labels(0.0)
+            return
+
+        idx = max(0, min(self.current_page_index, total - 1))
+        self.current_page_index = idx
+
+        # Единственная материализация текста страницы — вот этот срез.
+        # Начала страниц уже сдвинуты за пробелы в PaginatorWorker,
+        # так что strip() здесь не нужен. Если страница уже показана
+        # (повторный go_to_page, клик по той же странице) — setPlainText
+        # с его полной пере-раскладкой документа пропускаем.
+        start = self.page_offsets[idx]
+        if idx != self._last_shown_page:
+            end = self.page_offsets[idx + 1]
+            self.reader_edit.setPlainText(self.current_full_text[start:end])
+            self._last_shown_page = idx
+
+        # Прогресс — доля прочитанных символов, а не номер страницы:
+        # точнее при неровных страницах и не требует (total - 1)
+        ratio = start / self.total_chars if self.total_chars else 0.0
+
+        self.update_page_and_progress_labels(ratio)
+
+    def update_page_and_progress_labels(self, ratio: float):
+        total_pages = self.get_total_pages() if self.is_reading else 0
+
+        if not self.is_reading or total_pages == 0:
+            # показываем только сохранённый прогресс
+            if self.current_book_path:
+                r = float(self.book_progress.get(self.current_book_path, 0.0))
+                percent = int(round(r * 100))
+            else:
+                percent = 0
+            self.lbl_progress_info.setText(f"{percent}%")
+            self.lbl_progress_read.setText(f"{percent}%")
+            self.page_edit.setText("0")
+            self.lbl_page_total.setText("/0")
+            return
+
+        current_page = self.current_page_index + 1
+        if current_page < 1:
+            current_page = 1
+        if current_page > total_pages:
+            current_page = total_pages
+
+        self.page_edit.blockSignals(True)
+        self.page_edit.setText(str(current_page))
+        self.page_edit.blockSignals(False)
+        self.lbl_page_total.setText(f"/{total_pages}")
+
+        ratio = max(0.0, min(1.0, ratio))
+        percent = int(round(ratio * 100))
+        self.lbl_progress_info.setText(f"{percent}%")
+        self.lbl_progress_read.setText(f"{percent}%")
+
+        if self.current_book_path:
+            self.book_progress[self.current_book_path] = ratio
+            if not self._progress_flush_timer.isActive():
+                self._progress_flush_timer.start()
+
+        # навигационные кнопки
+        self.btn_prev_page.setEnabled(total_pages > 1 and current_page > 1)
+        self.btn_next_page.setEnabled(total_pages > 1 and current_page < total_pages)
+        self.page_edit.setEnabled(total_pages > 1)
+
+    # ---------- Режим чтения ----------
+
+    def open_current_book(self):
+        """
+        Переходим в режим ридера:
+        во ВСЁ правое поле отображается текст текущей страницы.
+        """
+        if not self.current_book_path:
+            return
+
+        path = self.current_book_path
+        info = self._get_book_info(path)
+
+        # Текст книги грузится лениво — при сканировании библиотеки он не нужен
+        full_text = info.full_text
+        if not full_text:
+            full_text = load_full_text(path)
+            info.full_text = full_text  # мемоизация для повторных открытий
+        if not full_text:
+            full_text = info.description or "(Текст книги недоступен)"
+
+        self.current_full_text = full_text
+        self.is_reading = True
+        self._ensure_reader_page()
+        self.stack.setCurrentWidget(self.reader_page)
+
+        ratio = float(self.book_progress.get(path, 0.0))
+
+        # Перепагинация после того, как виджет получит реальные размеры
+        QTimer.singleShot(0, lambda: self.paginate_current_text(ratio))
+
+    def back_to_info(self):
+        """Вернуться со страницы ридера на страницу информации о книге."""
+        self.cancel_paginate_worker()
+        self.is_reading = False
+        self.stack.setCurrentWidget(self.info_page)
+        # обновим прогресс на инфо-странице
+        if self.current_book_path:
+            info = self.book_info_cache.get(self.current_book_path)
+            self.show_book_info(info, self.current_book_path)
+
+    # ---------- Навигация по страницам ----------
+
+    def get_total_pages(self) -> int:
+        return max(0, len(self.page_offsets) - 1)
+
+    def go_to_page(self, page_index: int):
+        if not self.is_reading:
+            return
+        total = self.get_total_pages()
+        if total <= 0:
+            return
+        page_index = max(0, min(page_index, total - 1))
+        self.current_page_index = page_index
+
+        self.show_current_page()
+        # show_current_page уже вызывает update_page_and_progress_labels
+
+    def go_next_page(self):
+        if not self.is_reading:
+            return
+        self.go_to_page(self.current_page_index + 1)
+
+    def go_prev_page(self):
+        if not self.is_reading:
+            return
+        self.go_to_page(self.current_page_index - 1)
+
+    def on_page_edit_return(self):
+        """Переход к странице по номеру, введённому в поле."""
+        total = self.get_total_pages()
+        if not self.is_reading or total <= 0:
+            return
+
+        text = self.page_edit.text().strip()
+        if not text.isdigit():
+            return
+        page = int(text)
+        if page < 1:
+            page = 1
+        if page > total:
+            page = total
+
+        self.go_to_page(page - 1)
+
+    # ---------- Ресайз области чтения ----------
+
+    def on_reader_resized(self):
+        """
+        При изменении размера области чтения — взводим дебаунс-таймер;
+        сама перепагинация случится один раз после паузы в ресайзах.
+        """
+        if not self.is_reading or not self.current_full_text or not self.current_book_path:
+            return
+
+        # Прогресс фиксируем в начале серии ресайзов, чтобы финальная
+        # пагинация вернула читателя на то же место
+        if not self._repaginate_timer.isActive():
+            self._pending_ratio = float(self.book_progress.get(self.current_book_path, 0.0))
+
+        self._repaginate_timer.start()
+
+    def _do_repaginate(self):
+        """Отложенная перепагинация после серии resize-событий."""
+        if not self.is_reading or not self.current_full_text:
+            return
+
+        # resizeEvent приходит и без смены геометрии (активация окна,
+        # смена раскладки соседних виджетов): если viewport и шрифт те же,
+        # что при последней пагинации, пересчитывать нечего
+        viewport = self.reader_edit.viewport()
+        size_key = (viewport.width(), viewport.height(), self.reader_edit.font().key())
+        if size_key == self._last_paginate_size:
+            return
+
+        self._capacity_cache = None  # размеры изменились — оценка устарела
+        self.paginate_current_text(self._pending_ratio)
+
+    # ---------- Для совместимости: внешнее открытие (если захочешь) ----------
+
+    def open_current_book_external(self):
+        if not self.current_book_path:
+            return
+        url = QUrl.fromLocalFile(self.current_book_path)
+        QDesktopServices.openUrl(url)
+
+
+if __name__ == "__main__":
+    app = QApplication(sys.argv)
+
+    # глобальная иконка
+    if os.path.exists(ICON_PATH):
+        icon = QIcon(ICON_PATH)
+        app.setWindowIcon(icon)
+    else:
+        icon = QIcon()
+
+    apply_dark_theme(app)
+
+    w = MainWindow()
+
+    # Иконка также для главного окна
+    if not icon.isNull():
+        w.setWindowIcon(icon)
+
+    w.show()
+
+    # Восстановление максимизации
+    if getattr(w, "_restore_maximized", False):
+        w.showMaximized()
+
+    sys.exit(app.exec())
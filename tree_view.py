@@ -1,4 +1,8 @@
 import os
+import threading
+import concurrent.futures
+from contextlib import contextmanager
+from functools import partial
 
 from PyQt6.QtWidgets import (
     QTreeWidget,
@@ -8,11 +12,16 @@ from PyQt6.QtWidgets import (
     QInputDialog,
     QAbstractItemView,
 )
-from PyQt6.QtCore import Qt, QPoint, QObject, pyqtSignal
+from PyQt6.QtCore import Qt, QPoint, QObject, QThread, pyqtSignal
 
 from fb2_utils import extract_fb2_title
 
 
+# Тип узла ('f' — файл, 'd' — папка) хранится прямо на элементе дерева:
+# горячие пути (drag'n'drop, контекстное меню) читают флаг вместо
+# isfile/isdir-сисколла на каждый элемент. Проставляется при наполнении.
+KIND_ROLE = Qt.ItemDataRole.UserRole + 1
+
 class BookTreeWidget(QTreeWidget):
     """
     QTreeWidget с:
@@ -24,7 +33,12 @@ class BookTreeWidget(QTreeWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
 
-        self.root_path: str | None = None
+        self._root_path: str | None = None
+        self._root_abs: str | None = None
+
+        # Все строки одной высоты — дерево не меряет каждый элемент
+        # по отдельности при раскладке/прокрутке.
+        self.setUniformRowHeights(True)
 
         # Drag'n'drop настройки
         self.setDragEnabled(True)
@@ -37,6 +51,38 @@ class BookTreeWidget(QTreeWidget):
         self.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
         self.customContextMenuRequested.connect(self._on_context_menu)
 
+        # Фоновый перенос файлов после drag'n'drop
+        self._move_thread: QThread | None = None
+        self._move_worker: "MoveWorker | None" = None
+        self._move_errors: list[str] = []
+
+    @property
+    def root_path(self) -> str | None:
+        return self._root_path
+
+    @root_path.setter
+    def root_path(self, value: str | None):
+        # Нормализуем один раз при назначении: проверка "это корень?"
+        # в контекстном меню сравнивает готовые строки без abspath
+        self._root_path = value
+        self._root_abs = os.path.abspath(value) if value else None
+
+    @contextmanager
+    def bulk_update(self):
+        """
+        Массовое изменение дерева: перерисовка и сигналы (в т.ч.
+        itemSelectionChanged с его синхронным разбором fb2) выключены
+        на время блока, в конце — одна перерисовка viewport.
+        """
+        self.setUpdatesEnabled(False)
+        self.blockSignals(True)
+        try:
+            yield
+        finally:
+            self.blockSignals(False)
+            self.setUpdatesEnabled(True)
+            self.viewport().update()
+
     # --- drag'n'drop: переопределяем dropEvent для перемещения файлов ---
 
     def dropEvent(self, event):
@@ -50,7 +96,13 @@ class BookTreeWidget(QTreeWidget):
 
         for item in self.selectedItems():
             old_path = item.data(0, Qt.ItemDataRole.UserRole)
-            if isinstance(old_path, str) and os.path.isfile(old_path) and old_path.lower().endswith(".fb2"):
+            # .lower() только по хвосту: без копии всего пути, но
+            # регистронезависимо, как в остальных местах (Book.Fb2 и т.п.)
+            if not isinstance(old_path, str) or old_path[-4:].lower() != ".fb2":
+                continue
+            kind = item.data(0, KIND_ROLE)
+            is_file = kind == "f" if kind else os.path.isfile(old_path)
+            if is_file:
                 moved_items.append((item, old_path))
 
         super().dropEvent(event)
@@ -61,15 +113,21 @@ class BookTreeWidget(QTreeWidget):
         if not self.root_path:
             return
 
+        jobs: list[tuple[QTreeWidgetItem, str, str]] = []
+
         for item, old_path in moved_items:
             parent = item.parent()
             if parent is None:
                 base_dir = self.root_path
             else:
                 parent_path = parent.data(0, Qt.ItemDataRole.UserRole)
-                if isinstance(parent_path, str) and os.path.isdir(parent_path):
+                parent_kind = parent.data(0, KIND_ROLE)
+                if not parent_kind and isinstance(parent_path, str):
+                    # старые элементы без флага — как раньше, через сисколл
+                    parent_kind = "d" if os.path.isdir(parent_path) else "f"
+                if isinstance(parent_path, str) and parent_kind == "d":
                     base_dir = parent_path
-                elif isinstance(parent_path, str) and os.path.isfile(parent_path):
+                elif isinstance(parent_path, str) and parent_kind == "f":
                     base_dir = os.path.dirname(parent_path)
                 else:
                     base_dir = self.root_path
@@ -80,15 +138,46 @@ class BookTreeWidget(QTreeWidget):
                 item.setData(0, Qt.ItemDataRole.UserRole, new_path)
                 continue
 
-            try:
-                os.replace(old_path, new_path)
-                item.setData(0, Qt.ItemDataRole.UserRole, new_path)
-            except Exception as e:
-                QMessageBox.warning(
-                    self,
-                    "Ошибка перемещения",
-                    f"Не удалось переместить файл:\n{old_path}\n→ {new_path}\n\n{e}",
-                )
+            jobs.append((item, old_path, new_path))
+
+        if not jobs:
+            return
+
+        # Сами os.replace уходят в поток: перенос сотен файлов (тем более
+        # по сети) не должен замораживать GUI. Пути в элементах обновляются
+        # queued-сигналами по мере переноса; ошибки копятся и показываются
+        # одним сводным диалогом в конце.
+        if self._move_thread is not None:
+            self._move_thread.wait()  # дождёмся предыдущей пачки
+
+        self._move_errors = []
+        self._move_thread = QThread(self)
+        self._move_worker = MoveWorker(jobs)
+        self._move_worker.moveToThread(self._move_thread)
+
+        self._move_thread.started.connect(self._move_worker.run)
+        self._move_worker.moved.connect(self._on_file_moved)
+        self._move_worker.failed.connect(self._move_errors.append)
+        self._move_worker.finished.connect(self._move_thread.quit)
+        self._move_worker.finished.connect(self._move_worker.deleteLater)
+        self._move_thread.finished.connect(self._on_move_thread_finished)
+
+        self._move_thread.start()
+
+    def _on_file_moved(self, item: QTreeWidgetItem, new_path: str):
+        item.setData(0, Qt.ItemDataRole.UserRole, new_path)
+
+    def _on_move_thread_finished(self):
+        self._move_thread = None
+        self._move_worker = None
+
+        if self._move_errors:
+            QMessageBox.warning(
+                self,
+                "Ошибка перемещения",
+                "Не удалось переместить:\n\n" + "\n\n".join(self._move_errors),
+            )
+            self._move_errors = []
 
     # --- контекстное меню (создать / удалить папку) ---
 
@@ -107,9 +196,13 @@ class BookTreeWidget(QTreeWidget):
 
         if item is not None:
             item_path = item.data(0, Qt.ItemDataRole.UserRole)
-            if isinstance(item_path, str) and os.path.isdir(item_path):
+            kind = item.data(0, KIND_ROLE)
+            if isinstance(item_path, str) and (
+                kind == "d" if kind else os.path.isdir(item_path)
+            ):
                 is_folder = True
-                if self.root_path and os.path.abspath(item_path) == os.path.abspath(self.root_path):
+                # Пути в дереве хранятся абсолютными (от абсолютного корня)
+                if self._root_abs is not None and item_path == self._root_abs:
                     is_root = True
 
         if is_folder and not is_root:
@@ -137,7 +230,9 @@ class BookTreeWidget(QTreeWidget):
             base_dir = self.root_path
             parent_item = self.topLevelItem(0)
         else:
-            if is_folder and isinstance(item_path, str) and os.path.isdir(item_path):
+            # is_folder уже установлен по KIND_ROLE-флагу в _on_context_menu —
+            # повторный os.path.isdir здесь не нужен
+            if is_folder and isinstance(item_path, str):
                 base_dir = item_path
                 parent_item = item
             else:
@@ -157,6 +252,7 @@ class BookTreeWidget(QTreeWidget):
 
         new_item = QTreeWidgetItem([name])
         new_item.setData(0, Qt.ItemDataRole.UserRole, new_path)
+        new_item.setData(0, KIND_ROLE, "d")
         parent_item.addChild(new_item)
 
     def _delete_folder(self, item, item_path):
@@ -164,7 +260,11 @@ class BookTreeWidget(QTreeWidget):
             return
 
         try:
-            if os.listdir(item_path):
+            # Пустоту проверяем первым же элементом scandir,
+            # не материализуя весь листинг как os.listdir
+            with os.scandir(item_path) as it:
+                empty = next(it, None) is None
+            if not empty:
                 QMessageBox.information(
                     self,
                     "Нельзя удалить",
@@ -199,23 +299,71 @@ class BookTreeWidget(QTreeWidget):
             self.takeTopLevelItem(idx)
 
 
+class MoveWorker(QObject):
+    """В отдельном потоке: физически переносит файлы после drag'n'drop."""
+    moved = pyqtSignal(QTreeWidgetItem, str)
+    failed = pyqtSignal(str)  # готовая строка для сводного диалога
+    finished = pyqtSignal()
+
+    def __init__(self, jobs: list[tuple[QTreeWidgetItem, str, str]]):
+        super().__init__()
+        self.jobs = jobs
+
+    def run(self):
+        for item, old_path, new_path in self.jobs:
+            try:
+                os.replace(old_path, new_path)
+            except Exception as e:
+                self.failed.emit(f"{old_path}\n→ {new_path}\n{e}")
+                continue
+            self.moved.emit(item, new_path)
+        self.finished.emit()
+
+
 class MetadataWorker(QObject):
-    """В отдельном потоке: читает короткое название для дерева (title из fb2)."""
-    titleReady = pyqtSignal(QTreeWidgetItem, str)
+    """
+    В отдельном потоке: читает короткие названия для дерева (title из fb2).
+    Извлечение — это I/O + лёгкий разбор заголовка, поэтому файлы читаются
+    пулом потоков, а результаты уходят в GUI пачками: один queued-сигнал
+    на пачку вместо сигнала (и мутации дерева) на каждую книгу.
+    """
+    titlesReady = pyqtSignal(list)  # list[tuple[QTreeWidgetItem, str]]
     finished = pyqtSignal()
 
+    _BATCH = 64
+
     def __init__(self, tasks: list[tuple[str, QTreeWidgetItem]]):
         super().__init__()
         self.tasks = tasks
-        self._stopped = False
+        # Event вместо булевого флага: его видят и рабочие потоки пула,
+        # и сам extract_fb2_title, который проверяет отмену посреди разбора
+        self._cancel = threading.Event()
 
     def stop(self):
-        self._stopped = True
+        self._cancel.set()
 
     def run(self):
-        for path, item in self.tasks:
-            if self._stopped:
-                break
-            title = extract_fb2_title(path)
-            self.titleReady.emit(item, title)
+        paths = [path for path, _ in self.tasks]
+        items = [item for _, item in self.tasks]
+
+        extract = partial(extract_fb2_title, cancel=self._cancel)
+        cancelled = self._cancel.is_set
+
+        batch: list[tuple[QTreeWidgetItem, str]] = []
+        pool = concurrent.futures.ThreadPoolExecutor(
+            max_workers=min(8, os.cpu_count() or 1)
+        )
+        try:
+            for item, title in zip(items, pool.map(extract, paths, chunksize=16)):
+                if cancelled():
+                    break
+                batch.append((item, title))
+                if len(batch) >= self._BATCH:
+                    self.titlesReady.emit(batch)
+                    batch = []
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+        if batch and not cancelled():
+            self.titlesReady.emit(batch)
         self.finished.emit()